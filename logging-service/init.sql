@@ -1,14 +1,141 @@
-CREATE TABLE IF NOT EXISTS logs (
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Lookup tables for the repetitive columns of logs; rows only store their small integer keys
+CREATE TABLE IF NOT EXISTS log_services (
+    id SMALLSERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS log_levels (
+    id SMALLSERIAL PRIMARY KEY,
+    name VARCHAR(10) NOT NULL UNIQUE
+);
+
+-- URL without the query string, which stays inline in logs.url_query
+CREATE TABLE IF NOT EXISTS log_urls (
     id SERIAL PRIMARY KEY,
+    path VARCHAR(500) NOT NULL UNIQUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_log_urls_path_prefix ON log_urls(path varchar_pattern_ops);
+
+-- No foreign keys on the *_id columns: ingest only writes ids it got from the lookup tables,
+-- and per-row FK checks would cost more than the rest of the insert
+CREATE TABLE IF NOT EXISTS logs (
+    id BIGSERIAL,
     timestamp TIMESTAMP NOT NULL,
-    log_type VARCHAR(10) NOT NULL,
-    url VARCHAR(500),
+    level_id SMALLINT NOT NULL,
+    url_id INTEGER,
+    url_query VARCHAR(500),
     correlation_id VARCHAR(100),
-    service_name VARCHAR(100),
+    service_id SMALLINT,
     message TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    -- Record keys beyond the columns above (e.g. duration_ms, db_ms, status from merchant-service)
+    fields JSONB,
+    message_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(message, ''))) STORED,
+    dedup_key VARCHAR(64),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
 
-CREATE INDEX idx_logs_timestamp ON logs(timestamp);
+CREATE INDEX idx_logs_timestamp_id ON logs(timestamp, id);
 CREATE INDEX idx_logs_correlation_id ON logs(correlation_id);
-CREATE INDEX idx_logs_service_name ON logs(service_name);
\ No newline at end of file
+CREATE INDEX idx_logs_service_timestamp ON logs(service_id, timestamp);
+CREATE INDEX idx_logs_level_timestamp ON logs(level_id, timestamp);
+CREATE INDEX idx_logs_url_timestamp ON logs(url_id, timestamp);
+CREATE INDEX idx_logs_message_tsv ON logs USING GIN (message_tsv);
+CREATE INDEX idx_logs_message_trgm ON logs USING GIN (message gin_trgm_ops);
+CREATE UNIQUE INDEX idx_logs_dedup_key ON logs(dedup_key, timestamp);
+
+-- What the query layer reads: logs with service, level and URL decoded back to text
+CREATE OR REPLACE VIEW logs_view AS
+SELECT
+    l.id,
+    l.timestamp,
+    lv.name AS log_type,
+    u.path || COALESCE(l.url_query, '') AS url,
+    l.correlation_id,
+    s.name AS service_name,
+    l.message,
+    l.fields,
+    l.message_tsv,
+    l.dedup_key,
+    l.created_at,
+    l.service_id,
+    l.level_id,
+    l.url_id
+FROM logs l
+LEFT JOIN log_levels lv ON lv.id = l.level_id
+LEFT JOIN log_services s ON s.id = l.service_id
+LEFT JOIN log_urls u ON u.id = l.url_id;
+
+-- Per-minute counts maintained at ingest time, in the same transaction as the insert into logs
+CREATE TABLE IF NOT EXISTS log_stats_minute (
+    minute TIMESTAMP NOT NULL,
+    service_name VARCHAR(100) NOT NULL,
+    log_type VARCHAR(10) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    -- Lines the ingest policy (sampling, rate limit) dropped instead of storing
+    dropped BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (minute, service_name, log_type)
+);
+
+-- Lines the consumer could not parse, kept raw so they can be re-ingested after a parser fix
+CREATE TABLE IF NOT EXISTS log_dead_letters (
+    id BIGSERIAL PRIMARY KEY,
+    raw_payload BYTEA NOT NULL,
+    message_id VARCHAR(100),
+    error TEXT,
+    -- Properties of an envelope that failed as a whole; raw_payload is its body as received
+    content_type VARCHAR(100),
+    content_encoding VARCHAR(20),
+    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    reingest_attempts INTEGER NOT NULL DEFAULT 0,
+    last_attempt_at TIMESTAMP
+);
+
+-- Per-minute parser outcome counters (canonical format, JSON fallback, failed)
+CREATE TABLE IF NOT EXISTS log_parse_stats_minute (
+    minute TIMESTAMP PRIMARY KEY,
+    parsed BIGINT NOT NULL DEFAULT 0,
+    fallback_json BIGINT NOT NULL DEFAULT 0,
+    failed BIGINT NOT NULL DEFAULT 0
+);
+
+-- Days moved out of logs into Parquet files under LOG_ARCHIVE_DIR, one row per (file, service)
+CREATE TABLE IF NOT EXISTS log_archive_manifest (
+    day DATE NOT NULL,
+    service_name VARCHAR(100) NOT NULL,
+    path TEXT NOT NULL,
+    row_count BIGINT NOT NULL,
+    min_timestamp TIMESTAMP NOT NULL,
+    max_timestamp TIMESTAMP NOT NULL,
+    exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (path, service_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_log_archive_manifest_day ON log_archive_manifest (day, service_name);
+
+-- Ingest policy rate limits: one token bucket per service shared by every ingesting process
+CREATE TABLE IF NOT EXISTS log_rate_buckets (
+    service_name VARCHAR(100) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Daily partitions: logs_YYYYMMDD holds [day, day + 1)
+CREATE OR REPLACE FUNCTION ensure_log_partition(day DATE) RETURNS VOID AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF logs FOR VALUES FROM (%L) TO (%L)',
+        'logs_' || to_char(day, 'YYYYMMDD'),
+        day,
+        day + 1
+    );
+EXCEPTION
+    -- Another ingester created the same partition concurrently
+    WHEN duplicate_table OR unique_violation THEN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_log_partition(CURRENT_DATE + offset_days) FROM generate_series(-1, 7) AS offset_days;
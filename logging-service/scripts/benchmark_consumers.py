@@ -0,0 +1,195 @@
+"""
+Prepustnost tekmujočih porabnikov (src/consumer.py) pri 1..N procesih, proti lokalnemu nadomestku za RabbitMQ.
+
+Nadomestni posrednik je multiprocessing.Queue z zaostankom sporočil; vsak delavec ga bere prek
+StandInConnection (podmnožica pika BlockingConnection, ki jo uporablja LogConsumer) z istim
+prefetch/ack obnašanjem. Privzeto se meri razčlenjevanje in potrjevanje (--save none); z --save db
+se paketi res zapišejo v logging-db. Z --envelope N vsako sporočilo nosi N zapisov v paketni ovojnici
+(utils/log_envelope.py, gzip), kot jih pošilja notification-service z RABBITMQ_LOG_FORMAT=batch.
+
+Uporaba:
+    python scripts/benchmark_consumers.py --messages 400000 --workers 1,2,4,8
+    python scripts/benchmark_consumers.py --messages 400000 --envelope 200
+    DB_HOST=localhost DB_PORT=5439 python scripts/benchmark_consumers.py --save db
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from consumer import run_worker
+from utils.consumer_supervisor import ConsumerSupervisor
+from utils.log_envelope import ENVELOPE_CONTENT_TYPE, ENVELOPE_VERSION_HEADER
+
+FRAME_SIZE = 100
+
+class StandInChannel:
+    def __init__(self, broker, acked):
+        self.broker = broker
+        self.acked = acked
+        self.prefetch = 0
+        self.callback = None
+        self.buffer = []
+        self.next_tag = 1
+        self.acked_tag = 0
+
+    def queue_declare(self, queue, durable=False):
+        pass
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch = prefetch_count
+
+    def basic_consume(self, queue, on_message_callback):
+        self.callback = on_message_callback
+        return 'stand-in'
+
+    def basic_cancel(self, consumer_tag):
+        self.callback = None
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        count = delivery_tag - self.acked_tag if multiple else 1
+        self.acked_tag = delivery_tag
+        with self.acked.get_lock():
+            self.acked.value += count
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        raise RuntimeError('stand-in broker does not requeue, a batch failed to save')
+
+    def deliver(self, deadline):
+        while self.callback and self.next_tag - 1 - self.acked_tag < self.prefetch:
+            if not self.buffer:
+                try:
+                    self.buffer = self.broker.get(timeout=max(0.001, deadline - time.monotonic()))
+                except queue.Empty:
+                    return
+            body, properties = self.buffer.pop()
+            method = SimpleNamespace(delivery_tag=self.next_tag)
+            self.next_tag += 1
+            self.callback(self, method, properties, body)
+            if time.monotonic() >= deadline:
+                return
+
+class StandInConnection:
+    def __init__(self, broker, acked):
+        self._channel = StandInChannel(broker, acked)
+        self.is_open = True
+
+    def channel(self):
+        return self._channel
+
+    def process_data_events(self, time_limit=0):
+        deadline = time.monotonic() + time_limit
+        self._channel.deliver(deadline)
+        # Prefetch window full: wait like pika would until the flush interval elapses
+        remaining = deadline - time.monotonic()
+        if remaining > 0 and self._channel.callback and self._channel.buffer:
+            time.sleep(remaining)
+
+    def close(self):
+        self.is_open = False
+
+LINE_PROPERTIES = SimpleNamespace(message_id=None, content_type=None, content_encoding=None)
+
+def generate_lines(count):
+    return [
+        (
+            f"2026-01-01 21:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d},{i % 1000:03d} "
+            f"{('INFO', 'WARN', 'ERROR')[i % 3]} http://localhost:5003/payments/{i % 500} "
+            f"Correlation: {i:08x} [benchmark-service] - Klic storitve GET /payments/{i % 500}"
+        ).encode('utf-8')
+        for i in range(count)
+    ]
+
+def generate_envelopes(count, size):
+    envelopes = []
+    for start in range(0, count, size):
+        records = [
+            {
+                'id': f"benchmark-{i}",
+                'timestamp': f"2026-01-01T21:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}",
+                'log_type': ('INFO', 'WARN', 'ERROR')[i % 3],
+                'url': f"http://localhost:5003/payments/{i % 500}",
+                'correlation_id': f"{i:08x}",
+                'message': f"Klic storitve GET /payments/{i % 500}"
+            }
+            for i in range(start, min(start + size, count))
+        ]
+        body = json.dumps({'version': 1, 'service_name': 'benchmark-service', 'records': records}).encode('utf-8')
+        envelopes.append((gzip.compress(body), SimpleNamespace(
+            message_id=f"benchmark-envelope-{start}", content_type=ENVELOPE_CONTENT_TYPE,
+            content_encoding='gzip', headers={ENVELOPE_VERSION_HEADER: 1}
+        )))
+    return envelopes
+
+def generate_frames(count, envelope=0):
+    deliveries = generate_envelopes(count, envelope) if envelope > 1 else [(body, LINE_PROPERTIES) for body in generate_lines(count)]
+    return [deliveries[start:start + FRAME_SIZE] for start in range(0, len(deliveries), FRAME_SIZE)]
+
+def save_none(batch):
+    return len(batch.logs)
+
+def save_db(batch):
+    from services.log_service import LogService
+    return LogService.save_parsed_batch(batch)
+
+def run(workers, frames, total, args):
+    broker = multiprocessing.Queue()
+    acked = multiprocessing.Value('q', 0)
+    save = save_db if args.save == 'db' else save_none
+
+    started = time.perf_counter()
+    # Supervisor is forked before the queue's feeder thread exists, workers only ever read from it
+    supervisor_pid = os.fork()
+    if supervisor_pid == 0:
+        ConsumerSupervisor(workers, lambda index: run_worker(
+            index,
+            prefetch=args.prefetch,
+            batch_size=args.batch_size,
+            flush_interval=0.2,
+            connection_factory=lambda: StandInConnection(broker, acked),
+            save_batch=save
+        ), restart_delay=0).run()
+        os._exit(0)
+
+    for frame in frames:
+        broker.put(frame)
+
+    while acked.value < total:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    os.kill(supervisor_pid, signal.SIGTERM)
+    os.waitpid(supervisor_pid, 0)
+    broker.close()
+    return elapsed
+
+if __name__ == '__main__':
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--workers', default=','.join(str(2 ** i) for i in range(cores.bit_length()) if 2 ** i <= cores))
+    parser.add_argument('--prefetch', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--save', choices=('none', 'db'), default='none')
+    parser.add_argument('--envelope', type=int, default=0, help='records per batched envelope (0 = one line per message)')
+    args = parser.parse_args()
+
+    frames = generate_frames(args.messages, args.envelope)
+    deliveries = sum(len(frame) for frame in frames)
+    print(f"{args.messages} records in {deliveries} messages, {cores} core(s), save={args.save}")
+
+    baseline = None
+    for workers in (int(value) for value in args.workers.split(',')):
+        elapsed = run(workers, frames, deliveries, args)
+        rate = args.messages / elapsed
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {elapsed:8.3f} s  {rate:12.0f} records/s  {deliveries / elapsed:10.0f} msg/s  "
+              f"{rate / baseline:5.2f}x vs 1 worker")
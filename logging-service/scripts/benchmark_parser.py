@@ -0,0 +1,75 @@
+"""
+Mikro-benchmark razčlenjevanja logov: vrstice/s na jedro za staro pot (re.match + strptime),
+hitro pot v utils/log_parser.py in način s procesnim bazenom.
+
+Uporaba:
+    python scripts/benchmark_parser.py --lines 500000 --processes 4
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.log_parser import parse_batch
+
+def generate_messages(count):
+    return [
+        (
+            f"2026-01-01 21:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d},{i % 1000:03d} "
+            f"{('INFO', 'WARN', 'ERROR')[i % 3]} http://localhost:5003/payments/{i % 500} "
+            f"Correlation: {i:08x} [payment-service] - Klic storitve GET /payments/{i % 500}"
+        ).encode('utf-8')
+        for i in range(count)
+    ]
+
+def parse_legacy(bodies):
+    # Original consume_all_logs loop body: pattern string compiled (via re's cache lookup) on every call
+    logs = []
+    for body in bodies:
+        log_message = body.decode('utf-8')
+        pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) (\w+) (\S+) Correlation: (\S+) \[([^\]]+)\] - (.+)$'
+        match = re.match(pattern, log_message)
+        if match:
+            timestamp_str, log_type, url, correlation_id, service_name, message = match.groups()
+            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S,%f').isoformat()
+            logs.append({
+                'timestamp': timestamp,
+                'log_type': log_type,
+                'url': url,
+                'correlation_id': correlation_id,
+                'service_name': service_name,
+                'message': message
+            })
+    return logs
+
+def measure(name, parse, count, cores):
+    started = time.perf_counter()
+    parsed = parse()
+    elapsed = time.perf_counter() - started
+    parsed = getattr(parsed, 'logs', parsed)
+    assert len(parsed) == count, f"{name}: parsed {len(parsed)} of {count}"
+    rate = count / elapsed
+    print(f"{name:<22} {elapsed:7.3f} s  {rate:12.0f} lines/s  {rate / cores:12.0f} lines/s/core")
+    return rate
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=500000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    bodies = generate_messages(args.lines)
+    messages = [(body, None) for body in bodies]
+
+    legacy = measure('legacy regex+strptime', lambda: parse_legacy(bodies), args.lines, 1)
+    fast = measure('fast path (1 core)', lambda: parse_batch(messages, processes=1), args.lines, 1)
+
+    # Warm the pool up so worker start-up isn't counted
+    parse_batch(messages[:args.processes * 10000], processes=args.processes)
+    pooled = measure(f'process pool ({args.processes})', lambda: parse_batch(messages, processes=args.processes), args.lines, args.processes)
+
+    print(f"fast path vs legacy: {fast / legacy:.1f}x, process pool vs legacy: {pooled / legacy:.1f}x")
@@ -0,0 +1,113 @@
+"""
+Primerjava hitrosti shranjevanja logov: stari INSERT po vrsticah proti COPY poti v LogService.save_logs.
+
+Uporaba (potrebuje dostop do logging-db):
+    DB_HOST=localhost DB_PORT=5439 python scripts/benchmark_save_logs.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from db.db import get_db_connection, get_db_cursor
+from services.log_service import LogService
+from services.dictionary_service import DictionaryService
+
+BENCHMARK_SERVICE = 'benchmark-service'
+
+def generate_logs(count):
+    start = datetime.now()
+    return [
+        {
+            'timestamp': (start + timedelta(milliseconds=i)).isoformat(),
+            'log_type': ('INFO', 'WARN', 'ERROR')[i % 3],
+            'url': f'http://localhost:5004/notifications/{i % 100}',
+            'correlation_id': uuid.uuid4().hex[:8],
+            'service_name': BENCHMARK_SERVICE,
+            'message': f'Klic storitve GET /notifications/{i % 100}'
+        }
+        for i in range(count)
+    ]
+
+def save_logs_row_by_row(logs):
+    # Original implementation: one INSERT round trip per log line
+    conn = get_db_connection()
+    cursor = get_db_cursor(conn)
+    try:
+        for log in logs:
+            timestamp = log.get('timestamp')
+            if isinstance(timestamp, str):
+                try:
+                    timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                except:
+                    timestamp = datetime.now()
+            elif timestamp is None:
+                timestamp = datetime.now()
+
+            # Dictionary keys come from the same in-process cache as the bulk path
+            row = DictionaryService.encode_rows([(
+                timestamp, log.get('log_type'), log.get('url'), log.get('correlation_id'),
+                log.get('service_name'), log.get('message'), None, None
+            )])[0]
+            cursor.execute(
+                """
+                INSERT INTO logs (timestamp, level_id, url_id, url_query, correlation_id, service_id, message, dedup_key, fields)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                row
+            )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return len(logs)
+
+def cleanup(logs, dictionary=False):
+    conn = get_db_connection()
+    cursor = get_db_cursor(conn)
+    try:
+        cursor.execute("DELETE FROM logs WHERE service_id = (SELECT id FROM log_services WHERE name = %s)", (BENCHMARK_SERVICE,))
+        # The COPY path also counts every row in the per-minute rollup
+        cursor.execute(
+            "DELETE FROM log_stats_minute WHERE service_name = %s AND minute BETWEEN date_trunc('minute', %s::timestamp) AND %s::timestamp",
+            (BENCHMARK_SERVICE, logs[0]['timestamp'], logs[-1]['timestamp'])
+        )
+        if dictionary:
+            # Only after the last run, DictionaryService keeps the ids cached in between; the URL paths
+            # may also be used by real notification-service logs, those stay
+            cursor.execute("DELETE FROM log_services WHERE name = %s", (BENCHMARK_SERVICE,))
+            cursor.execute(
+                "DELETE FROM log_urls u WHERE u.path = ANY(%s) AND NOT EXISTS (SELECT 1 FROM logs l WHERE l.url_id = u.id)",
+                (sorted({DictionaryService.split_url(log['url'])[0] for log in logs}),)
+            )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def run(name, save, logs):
+    cleanup(logs)
+    started = time.perf_counter()
+    saved = save(logs)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} {saved:>8} rows  {elapsed:8.3f} s  {saved / elapsed:12.0f} rows/s")
+    return elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    logs = generate_logs(args.rows)
+
+    try:
+        row_by_row = run('row-by-row', save_logs_row_by_row, logs)
+        bulk = run('copy', lambda batch: LogService.save_logs(batch, batch_size=args.batch_size), logs)
+        print(f"speedup: {row_by_row / bulk:.1f}x")
+    finally:
+        cleanup(logs, dictionary=True)
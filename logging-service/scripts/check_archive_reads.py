@@ -0,0 +1,100 @@
+"""
+Preveri branje arhiva (ArchiveService.iter_logs) brez baze: v začasni LOG_ARCHIVE_DIR zapiše Parquet datoteke
+in primerja vrstice, ki jih vrne branje, z vrsticami, ki jih izbere preprost filter v Pythonu (vrstni red
+(timestamp, id) DESC, cursor, filtri). Filtre dobi iz LogController._parse_query_args, tako kot /logs/query,
+tudi za čase z zamikom (npr. 2026-01-01T05:00:00+02:00).
+
+Uporaba:
+    python scripts/check_archive_reads.py
+    python scripts/check_archive_reads.py --rows 20000 --row-group-size 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DAY = datetime(2026, 1, 1)
+
+def generate(count, first_id):
+    rows = []
+    for i in range(count):
+        timestamp = DAY + timedelta(microseconds=random.randint(0, 86400 * 10**6 - 1))
+        rows.append((
+            first_id + i, timestamp, random.choice(('INFO', 'WARN', 'ERROR')), f'/resource/{i % 7}',
+            f'corr-{i % 50}', random.choice(('svc-a', 'svc-b', 'svc-c')), f'message {i}',
+            json.dumps({'i': i}) if i % 2 else None, timestamp
+        ))
+    return sorted(rows, key=lambda row: (row[1], row[0]))
+
+class RowsCursor:
+    """Stands in for the export cursor ArchiveService._write_parquet reads from."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+def expected(rows, filters, after):
+    def matches(row):
+        if filters.get('from') and row['timestamp'] < filters['from']:
+            return False
+        if filters.get('to') and row['timestamp'] >= filters['to']:
+            return False
+        if any(filters.get(column) and row[column] != filters[column] for column in ('service_name', 'log_type', 'correlation_id')):
+            return False
+        return not after or (row['timestamp'], row['id']) < after
+    return sorted((row for row in rows if matches(row)), key=lambda row: (row['timestamp'], row['id']), reverse=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=8000)
+    parser.add_argument('--row-group-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ['LOG_ARCHIVE_DIR'] = tempfile.mkdtemp(prefix='log-archive-')
+    os.environ['LOG_ARCHIVE_ROW_GROUP_SIZE'] = str(args.row_group_size)
+    os.environ.setdefault('LOG_ARCHIVE_READ_BATCH_SIZE', '300')
+
+    from services.archive_service import ArchiveService, ARCHIVE_COLUMNS
+    from controllers.log_controller import LogController
+
+    random.seed(1)
+    # Two files for one day, like a day that got late rows exported after it
+    files = {'day.parquet': generate(args.rows, 1), 'late.parquet': generate(args.rows // 4, args.rows + 1)}
+    rows = []
+    for path, file_rows in files.items():
+        ArchiveService._write_parquet(RowsCursor(list(file_rows)), os.path.join(os.environ['LOG_ARCHIVE_DIR'], path))
+        for values in file_rows:
+            row = dict(zip(ARCHIVE_COLUMNS, values))
+            row['fields'] = json.loads(row['fields']) if row['fields'] else None
+            rows.append(row)
+    days = [(DAY.date(), list(files), None)]
+
+    middle = DAY + timedelta(hours=12)
+    cases = {
+        'all': {},
+        'service': {'service_name': 'svc-b'},
+        'naive range': {'from': '2026-01-01T05:00:00', 'to': '2026-01-01T07:00:00'},
+        'utc offset': {'from': '2026-01-01T05:00:00+00:00', 'to': '2026-01-01T07:00:00Z'},
+        'other offset': {'from': '2026-01-01T07:00:00+02:00', 'service_name': 'svc-a', 'log_type': 'ERROR'},
+        'correlation id': {'correlation_id': 'corr-7', 'from': '2020-01-01T00:00:00+00:00'},
+    }
+
+    failures = 0
+    for name, query in cases.items():
+        filters, _, _ = LogController._parse_query_args(query)
+        for after in (None, (middle, args.rows // 2)):
+            got = list(ArchiveService.iter_logs(filters, after, days))
+            want = expected(rows, filters, after)
+            ok = got == want
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {name}{' after cursor' if after else ''}: {len(got)} rows (expected {len(want)})")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,113 @@
+"""
+Preveri, da /logs/query filtri uporabljajo indekse in obrežejo particije (EXPLAIN na večji tabeli).
+
+Uporaba (potrebuje dostop do logging-db):
+    DB_HOST=localhost DB_PORT=5439 python scripts/explain_log_queries.py --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from db.db import get_db_connection, get_db_cursor
+from services.log_service import LogService
+
+SERVICE_PREFIX = 'explain-service-'
+DAYS = 14
+
+def seed(count):
+    end = datetime.now().replace(microsecond=0)
+    step = timedelta(days=DAYS) / count
+    logs = []
+    for i in range(count):
+        log_type = 'ERROR' if i % 50 == 0 else 'WARN' if i % 12 == 0 else 'INFO'
+        logs.append({
+            'timestamp': (end - step * i).isoformat(),
+            'log_type': log_type,
+            'url': f'http://explain-{i % 40}:5000/resource/{i % 1000}',
+            'correlation_id': uuid.uuid4().hex[:12],
+            'service_name': f'{SERVICE_PREFIX}{i % 20}',
+            'message': f'Seeded log line {i}'
+        })
+    LogService.save_logs(logs)
+    return end, logs
+
+def cleanup(cursor, end):
+    cursor.execute(
+        "DELETE FROM logs WHERE service_id IN (SELECT id FROM log_services WHERE name LIKE %s)",
+        (SERVICE_PREFIX + '%',)
+    )
+    # save_logs also counted every seeded row in the per-minute rollup
+    cursor.execute(
+        "DELETE FROM log_stats_minute WHERE service_name LIKE %s AND minute BETWEEN date_trunc('minute', %s::timestamp) AND %s",
+        (SERVICE_PREFIX + '%', end - timedelta(days=DAYS), end)
+    )
+    # The seeded services and hosts exist only here; a URL path still used by some log stays
+    cursor.execute("DELETE FROM log_services WHERE name LIKE %s", (SERVICE_PREFIX + '%',))
+    cursor.execute(
+        "DELETE FROM log_urls u WHERE u.path LIKE %s AND NOT EXISTS (SELECT 1 FROM logs l WHERE l.url_id = u.id)",
+        ('http://explain-%',)
+    )
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+def explain(cursor, filters):
+    sql, params = LogService.build_query(filters, 100)
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    nodes = list(plan_nodes(cursor.fetchone()['QUERY PLAN'][0]['Plan']))
+    scans = [node for node in nodes if node.get('Relation Name', '').startswith('logs')]
+    return nodes, scans
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    end, logs = seed(args.rows)
+    sample = logs[args.rows // 2]
+
+    conn = get_db_connection()
+    cursor = get_db_cursor(conn)
+    failures = 0
+    try:
+        cursor.execute("ANALYZE logs")
+        # Empty partitions (the days ahead) are always seq scanned, that costs nothing
+        cursor.execute("SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE 'logs\\_%%' AND reltuples > 0")
+        filled = {row['relname'] for row in cursor.fetchall()}
+        window = {'from': end - timedelta(days=2), 'to': end}
+        cases = {
+            'time range': dict(window),
+            'service': dict(window, service_name=f'{SERVICE_PREFIX}3'),
+            'level': dict(window, log_type='ERROR'),
+            'correlation id': {'correlation_id': sample['correlation_id']},
+            'url prefix': dict(window, url_prefix='http://explain-7:5000/resource/12'),
+        }
+
+        for name, filters in cases.items():
+            nodes, scans = explain(cursor, filters)
+            seq_scans = [node['Relation Name'] for node in scans if node['Node Type'] == 'Seq Scan' and node['Relation Name'] in filled]
+            index_names = sorted({node['Index Name'] for node in nodes if 'Index Name' in node and node['Index Name'].startswith('logs_')})
+            partitions = sorted({node['Relation Name'] for node in scans})
+
+            ok = not seq_scans and bool(index_names)
+            if 'from' in filters:
+                ok = ok and len(partitions) <= 3
+            failures += not ok
+
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: partitions={len(partitions)} indexes={index_names[:3]} seq_scans={seq_scans[:3]}")
+            if not ok:
+                print(json.dumps([node['Node Type'] for node in nodes]))
+    finally:
+        cleanup(cursor, end)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    sys.exit(1 if failures else 0)
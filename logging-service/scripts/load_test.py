@@ -0,0 +1,80 @@
+"""
+Obremenitveni test bralnih endpointov logging-service (req/s in latenca).
+
+Primerjava razvojnega strežnika in gunicorn načina na istih podatkih:
+    python src/main.py                         # pred: Flask razvojni strežnik
+    python scripts/load_test.py --label dev
+    gunicorn -c gunicorn.conf.py               # po: več workerjev/niti
+    python scripts/load_test.py --label gunicorn
+"""
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+def default_paths():
+    today = date.today()
+    week_ago = today - timedelta(days=7)
+    return [
+        f'/logs/{week_ago.isoformat()}/{today.isoformat()}?limit=100',
+        f'/logs/query?from={week_ago.isoformat()}T00:00:00&limit=100',
+        '/logs/stats?bucket=hour',
+    ]
+
+def worker(base_url, paths, deadline, results, lock):
+    latencies = []
+    errors = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:5007')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--path', action='append', help='Endpoint to hit (repeatable), default: read endpoints')
+    parser.add_argument('--label', default='run')
+    args = parser.parse_args()
+
+    paths = args.path or default_paths()
+    results = {'latencies': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    threads = [
+        threading.Thread(target=worker, args=(args.url, paths, deadline, results, lock))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(results['latencies'])
+    print(f"[{args.label}] {len(latencies)} requests in {elapsed:.1f}s, concurrency={args.concurrency}")
+    print(f"[{args.label}] {len(latencies) / elapsed:.1f} req/s, errors={results['errors']}")
+    print(f"[{args.label}] latency p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
@@ -0,0 +1,39 @@
+from services.archive_service import ArchiveService
+from services.partition_service import PartitionService
+import argparse
+import os
+import signal
+import threading
+import traceback
+
+LOG_ARCHIVE_INTERVAL = float(os.getenv('LOG_ARCHIVE_INTERVAL', 3600))
+
+def run_once(days=None):
+    # Partitions for the coming days too, so a long-running deployment never runs out of them
+    PartitionService.create_future_partitions()
+    cutoff, exported = ArchiveService.export_older_than(days)
+    print(f"Archived {len(exported)} partition(s) older than {cutoff.isoformat()}: {sum(e['rows'] for e in exported)} rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Moves closed log days to Parquet files on a schedule')
+    parser.add_argument('--interval', type=float, default=LOG_ARCHIVE_INTERVAL,
+                        help='seconds between runs (default LOG_ARCHIVE_INTERVAL)')
+    parser.add_argument('--older-than', type=int, default=None, help='days kept in Postgres (default LOG_HOT_DAYS)')
+    parser.add_argument('--once', action='store_true', help='run a single export and exit')
+    args = parser.parse_args()
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+
+    while not stopped.is_set():
+        try:
+            run_once(args.older_than)
+        except Exception:
+            # A day that couldn't be swapped stays attached and is retried on the next run
+            traceback.print_exc()
+        if args.once:
+            break
+        stopped.wait(args.interval)
+
+    print("Archiver stopped")
@@ -0,0 +1,39 @@
+from utils.rabbitmq_setup import setup_rabbitmq
+from utils.log_consumer import LogConsumer
+from utils.consumer_supervisor import ConsumerSupervisor, default_worker_count
+from services.partition_service import PartitionService
+from db.db import close_pool
+import argparse
+import os
+import signal
+
+def run_worker(index, **options):
+    consumer = LogConsumer(**options)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: consumer.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: consumer.stop())
+
+    consumer.run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Competing logging_queue consumers')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('CONSUMER_WORKERS', 0)) or default_worker_count(),
+                        help='consumer processes, at most one per core (default CONSUMER_WORKERS or the core count)')
+    parser.add_argument('--prefetch', type=int, default=None, help='unacked messages per consumer (default CONSUMER_PREFETCH)')
+    parser.add_argument('--batch-size', type=int, default=None, help='messages per DB write (default CONSUMER_BATCH_SIZE)')
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, default_worker_count()))
+
+    print("Setting up RabbitMQ...")
+    setup_rabbitmq()
+    print("RabbitMQ setup completed (exchange, queue, binding created)")
+
+    PartitionService.create_future_partitions()
+    # Workers build their own pools; closing here keeps them from inheriting the supervisor's sockets
+    close_pool()
+
+    ConsumerSupervisor(
+        workers,
+        lambda index: run_worker(index, prefetch=args.prefetch, batch_size=args.batch_size)
+    ).run()
@@ -0,0 +1,55 @@
+from services.dead_letter_service import DeadLetterService
+from flask import jsonify
+from utils.pagination import parse_timestamp
+
+class DeadLetterController:
+    @staticmethod
+    def get_metrics(args):
+        try:
+            date_from = parse_timestamp(args['from']) if args.get('from') else None
+            date_to = parse_timestamp(args['to']) if args.get('to') else None
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            counters, dead_letters = DeadLetterService.get_metrics(date_from, date_to)
+            
+            return jsonify({
+                'counters': counters,
+                'dead_letters': {
+                    'pending': dead_letters['pending'],
+                    'oldest': dead_letters['oldest'].isoformat() if dead_letters['oldest'] else None
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to retrieve ingest metrics',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def reingest(args):
+        try:
+            batch_size = int(args['batch_size']) if args.get('batch_size') else None
+            max_batches = int(args['max_batches']) if args.get('max_batches') else None
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            result = DeadLetterService.reingest(batch_size, max_batches)
+            
+            return jsonify({
+                'message': 'Dead letters re-ingested',
+                **result
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to re-ingest dead letters',
+                'details': str(e)
+            }), 500
@@ -1,22 +1,33 @@
-from services.log_service import LogService
-from utils.rabbitmq_setup import consume_all_logs, setup_rabbitmq
-from flask import jsonify
+from services.log_service import LogService, LOG_QUERY_MAX_LIMIT
+from services.stats_service import StatsService, STATS_BUCKETS
+from services.ingest_service import IngestService
+from utils.rabbitmq_setup import consume_all_logs, ensure_rabbitmq
+from utils.pagination import encode_cursor, decode_cursor, parse_timestamp
+from utils.log_tail import log_tail, LOG_TAIL_MAX_VIEWERS, LOG_TAIL_URL
+from flask import jsonify, redirect, Response, stream_with_context
+from urllib.parse import urlencode
+from datetime import datetime, timedelta
+import json
+import os
+import queue
+import re
+import zlib
+
+LOG_TAIL_KEEPALIVE = float(os.getenv('LOG_TAIL_KEEPALIVE', 15))
 
 class LogController:
     @staticmethod
     def fetch_and_save_logs():
         try:
-            setup_rabbitmq()
-            logs = consume_all_logs()
+            ensure_rabbitmq()
+            saved_count = consume_all_logs(LogService.save_parsed_batch)
             
-            if not logs:
+            if not saved_count:
                 return jsonify({
                     'message': 'No logs found in queue',
                     'count': 0
                 }), 200
             
-            saved_count = LogService.save_logs(logs)
-            
             return jsonify({
                 'message': 'Logs successfully fetched and saved',
                 'count': saved_count
@@ -28,41 +39,310 @@ class LogController:
             }), 500
 
     @staticmethod
-    def get_logs_by_date_range(date_from, date_to):
+    def ingest_batch(request):
+        encoding = (request.headers.get('Content-Encoding') or '').lower()
+        content_type = (request.mimetype or '').lower()
+        gzip = encoding == 'gzip' or content_type in ('application/gzip', 'application/x-gzip')
+        
+        try:
+            totals, batches = IngestService.ingest_stream(request.stream, gzip=gzip)
+            
+            return jsonify({
+                'message': 'Logs ingested',
+                **totals,
+                'batches': batches
+            }), 201
+        except zlib.error as e:
+            # Lines before the cut may already be saved, so the client knows what a retry will duplicate
+            return jsonify({
+                'error': 'Invalid gzip body',
+                'details': str(e),
+                **getattr(e, 'totals', {}),
+                'batches': getattr(e, 'batches', [])
+            }), 400
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to ingest logs',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def tail_logs(args):
+        filters = {key: args.get(key) for key in ('service_name', 'log_type', 'correlation_id')}
+        if not LOG_TAIL_MAX_VIEWERS and LOG_TAIL_URL:
+            query = urlencode({key: value for key, value in filters.items() if value})
+            return redirect(f"{LOG_TAIL_URL}?{query}" if query else LOG_TAIL_URL, code=307)
+        if not log_tail.reserve_viewer():
+            return jsonify({
+                'error': 'Too many live tail viewers, try again later'
+            }), 503, {'Retry-After': '30'}
+        
+        def generate():
+            # Subscribed only once the stream runs: a client gone before the first chunk never starts the
+            # generator, so a subscription made outside it would never be removed
+            subscription = log_tail.subscribe(filters)
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    try:
+                        log = subscription.queue.get(timeout=LOG_TAIL_KEEPALIVE)
+                    except queue.Empty:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ': keepalive\n\n'
+                        continue
+                    yield f"id: {log['id']}\nevent: log\ndata: {json.dumps(log)}\n\n"
+            finally:
+                log_tail.unsubscribe(subscription)
+        
+        response = Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        # The server closes the response iterable whether or not the generator ever started
+        response.call_on_close(log_tail.release_viewer)
+        return response
+
+    @staticmethod
+    def _serialize_log(log):
+        log = dict(log)
+        if log.get('timestamp'):
+            log['timestamp'] = log['timestamp'].isoformat()
+        if log.get('created_at'):
+            log['created_at'] = log['created_at'].isoformat()
+        return log
+
+    @staticmethod
+    def _serialize_logs(logs):
+        return [LogController._serialize_log(log) for log in logs]
+
+    @staticmethod
+    def _parse_query_args(args, default_limit=1000):
+        filters = {key: args.get(key) for key in ('service_name', 'log_type', 'correlation_id', 'url_prefix', 'q', 'contains')}
+        for key in ('from', 'to'):
+            filters[key] = parse_timestamp(args[key]) if args.get(key) else None
+        
+        limit = int(args['limit']) if args.get('limit') else default_limit
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        # The query is capped at LOG_QUERY_MAX_LIMIT, so the full-page check has to use the same limit
+        limit = min(limit, LOG_QUERY_MAX_LIMIT)
+        after = decode_cursor(args['cursor']) if args.get('cursor') else None
+        
+        return filters, limit, after
+
+    @staticmethod
+    def _stream_ndjson(filters, after):
+        def generate():
+            for log in LogService.stream_logs(filters, after):
+                yield json.dumps(LogController._serialize_log(log)) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    @staticmethod
+    def _page_response(filters, limit, after, extra=None):
+        logs = LogService.query_logs(filters, limit, after)
+        
+        logs_list = LogController._serialize_logs(logs)
+        
+        # A full page means there may be more rows after the last one
+        next_cursor = None
+        if logs and len(logs) >= limit:
+            next_cursor = encode_cursor(logs[-1]['timestamp'], logs[-1]['id'])
+        
+        return jsonify({
+            'logs': logs_list,
+            'count': len(logs_list),
+            'next_cursor': next_cursor,
+            **(extra or {})
+        }), 200
+
+    @staticmethod
+    def get_logs_by_date_range(date_from, date_to, args):
+        try:
+            # Paged like /logs/query, a whole range at once is what format=ndjson is for
+            filters, limit, after = LogController._parse_query_args(args, default_limit=LOG_QUERY_MAX_LIMIT)
+            filters['from'] = parse_timestamp(date_from)
+            filters['to'] = parse_timestamp(date_to) + timedelta(days=1)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            if args.get('format') == 'ndjson':
+                return LogController._stream_ndjson(filters, after)
+            
+            return LogController._page_response(filters, limit, after, {
+                'date_from': date_from,
+                'date_to': date_to
+            })
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to retrieve logs',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def query_logs(args):
+        try:
+            filters, limit, after = LogController._parse_query_args(args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            if args.get('format') == 'ndjson':
+                return LogController._stream_ndjson(filters, after)
+            
+            return LogController._page_response(filters, limit, after)
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to retrieve logs',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def search_logs(args):
         try:
-            logs = LogService.get_logs_by_date_range(date_from, date_to)
+            filters, limit, after = LogController._parse_query_args(args, default_limit=100)
+            if not filters.get('q') and not filters.get('contains'):
+                raise ValueError('Either q or contains is required')
+            order = args.get('order', 'time')
+            if order not in ('time', 'relevance'):
+                raise ValueError('order must be time or relevance')
+            if order == 'relevance' and not filters.get('q'):
+                raise ValueError('order=relevance requires q')
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            if order == 'time':
+                return LogController._page_response(filters, limit, after)
             
-            logs_list = [dict(log) for log in logs]
+            # Ranked results are a single top-N page, keyset pagination only applies to time order
+            logs = LogService.search_by_relevance(filters, limit)
             
-            for log in logs_list:
-                if log.get('timestamp'):
-                    log['timestamp'] = log['timestamp'].isoformat()
-                if log.get('created_at'):
-                    log['created_at'] = log['created_at'].isoformat()
+            logs_list = LogController._serialize_logs(logs)
             
             return jsonify({
                 'logs': logs_list,
                 'count': len(logs_list),
-                'date_from': date_from,
-                'date_to': date_to
+                'next_cursor': None
             }), 200
         except Exception as e:
             return jsonify({
-                'error': 'Failed to retrieve logs',
+                'error': 'Failed to search logs',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def get_stats(args):
+        try:
+            date_to = parse_timestamp(args['to']) if args.get('to') else datetime.now()
+            date_from = parse_timestamp(args['from']) if args.get('from') else date_to - timedelta(hours=1)
+            bucket = args.get('bucket', 'minute')
+            if bucket not in STATS_BUCKETS:
+                raise ValueError(f"bucket must be one of {', '.join(STATS_BUCKETS)}")
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'details': str(e)
+            }), 400
+        
+        try:
+            rows = StatsService.get_stats(
+                date_from, date_to, bucket,
+                service_name=args.get('service_name'),
+                log_type=args.get('log_type')
+            )
+            
+            totals, dropped = {}, {}
+            for row in rows:
+                totals[row['log_type']] = totals.get(row['log_type'], 0) + row['count']
+                if row['dropped']:
+                    dropped[row['log_type']] = dropped.get(row['log_type'], 0) + row['dropped']
+            
+            return jsonify({
+                'from': date_from.isoformat(),
+                'to': date_to.isoformat(),
+                'bucket': bucket,
+                'totals': totals,
+                'dropped': dropped,
+                'stats': [
+                    {**row, 'bucket': row['bucket'].isoformat()}
+                    for row in rows
+                ]
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to retrieve log stats',
                 'details': str(e)
             }), 500
 
     @staticmethod
     def delete_all_logs():
         try:
-            deleted_count = LogService.delete_all_logs()
+            LogService.delete_all_logs()
             
             return jsonify({
-                'message': 'All logs deleted successfully',
-                'deleted_count': deleted_count
+                'message': 'All logs deleted successfully'
             }), 200
         except Exception as e:
             return jsonify({
                 'error': 'Failed to delete logs',
                 'details': str(e)
-            }), 500
\ No newline at end of file
+            }), 500
+
+    @staticmethod
+    def delete_logs_older_than(older_than):
+        match = re.fullmatch(r'(\d+)d?', older_than.strip())
+        if not match:
+            return jsonify({
+                'error': 'Invalid older_than value, expected number of days (e.g. 30d)'
+            }), 400
+        
+        try:
+            cutoff, dropped_partitions, deleted_archives = LogService.delete_logs_older_than(int(match.group(1)))
+            
+            return jsonify({
+                'message': 'Old logs deleted successfully',
+                'cutoff': cutoff.isoformat(),
+                'dropped_partitions': dropped_partitions,
+                'deleted_archives': deleted_archives
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to delete logs',
+                'details': str(e)
+            }), 500
+
+    @staticmethod
+    def archive_logs(args):
+        try:
+            older_than = int(args['older_than'].strip().rstrip('d')) if args.get('older_than') else None
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid older_than value, expected number of days (e.g. 7d)',
+                'details': str(e)
+            }), 400
+        
+        try:
+            cutoff, exported = LogService.archive_logs_older_than(older_than)
+            
+            return jsonify({
+                'message': 'Old logs archived successfully',
+                'cutoff': cutoff.isoformat(),
+                'exported': exported
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to archive logs',
+                'details': str(e)
+            }), 500
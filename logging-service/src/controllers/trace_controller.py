@@ -0,0 +1,21 @@
+from services.trace_service import TraceService
+from flask import jsonify
+
+class TraceController:
+    @staticmethod
+    def get_trace(correlation_id):
+        try:
+            trace = TraceService.get_trace(correlation_id)
+            
+            if trace is None:
+                return jsonify({
+                    'error': 'Trace not found',
+                    'correlation_id': correlation_id
+                }), 404
+            
+            return jsonify(trace), 200
+        except Exception as e:
+            return jsonify({
+                'error': 'Failed to retrieve trace',
+                'details': str(e)
+            }), 500
@@ -1,16 +1,126 @@
 import psycopg2
 import os
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 
-def get_db_connection():
-    conn = psycopg2.connect(
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 30))
+# Connections idle for longer than this are pinged with SELECT 1 before being handed out
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', 30))
+
+def _connection_params():
+    return dict(
         host=os.getenv('DB_HOST', 'localhost'),
         database=os.getenv('DB_NAME', 'loggingdb'),
         user=os.getenv('DB_USER', 'postgres'),
         password=os.getenv('DB_PASS', 'postgres'),
-        port=5432
+        port=int(os.getenv('DB_PORT', 5432))
     )
+
+def get_db_connection():
+    conn = psycopg2.connect(**_connection_params())
     return conn
 
 def get_db_cursor(conn):
-    return conn.cursor(cursor_factory=RealDictCursor)
\ No newline at end of file
+    return conn.cursor(cursor_factory=RealDictCursor)
+
+class ConnectionPool:
+    def __init__(self, min_size, max_size):
+        self.pid = os.getpid()
+        self.max_size = max_size
+        self._pool = ThreadedConnectionPool(min_size, max_size, **_connection_params())
+        # ThreadedConnectionPool raises when exhausted, the semaphore makes callers wait for a free slot instead
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used = {}
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) < DB_POOL_HEALTHCHECK_IDLE:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def checkout(self):
+        if not self._slots.acquire(timeout=DB_POOL_CHECKOUT_TIMEOUT):
+            raise PoolError(f"No DB connection available within {DB_POOL_CHECKOUT_TIMEOUT}s")
+
+        try:
+            for _ in range(self.max_size + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+            raise PoolError("Could not obtain a healthy DB connection")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def checkin(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+                return
+
+            # Hand the connection back in a clean state: no open transaction, default autocommit
+            try:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        # A forked worker must not share the parent's sockets, so each process builds its own pool
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+        return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+@contextmanager
+def db_connection():
+    pool = get_pool()
+    conn = pool.checkout()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.checkin(conn, broken)
@@ -2,7 +2,11 @@ from flask import Flask
 from flask_cors import CORS
 from flasgger import Swagger
 from routes.log_routes import log_bp
-from utils.rabbitmq_setup import setup_rabbitmq
+from routes.trace_routes import trace_bp
+from routes.dead_letter_routes import dead_letter_bp
+from utils.rabbitmq_setup import ensure_rabbitmq
+from utils.log_consumer import start_background_consumer
+from services.partition_service import PartitionService
 import os
 
 app = Flask(__name__)
@@ -35,13 +39,13 @@ swagger_template = {
 Swagger(app, config=swagger_config, template=swagger_template)
 
 app.register_blueprint(log_bp)
+app.register_blueprint(trace_bp)
+app.register_blueprint(dead_letter_bp)
 
-if __name__ == "__main__":
-    port = int(os.getenv("PORT", 5007))
-
+def init_worker():
     try:
         print("Setting up RabbitMQ...")
-        setup_rabbitmq()
+        ensure_rabbitmq()
         print("RabbitMQ setup completed (exchange, queue, binding created)")
     except Exception as e:
         print(f"Failed to setup RabbitMQ:  {e}")
@@ -49,4 +53,19 @@ if __name__ == "__main__":
 
         traceback.print_exc()
 
+    try:
+        PartitionService.create_future_partitions()
+    except Exception as e:
+        print(f"Failed to create log partitions: {e}")
+
+    # Continuously stream logs from RabbitMQ into the DB; POST /logs still works for manual drains
+    if os.getenv("LOG_CONSUMER_ENABLED", "true").lower() == "true":
+        start_background_consumer()
+
+if __name__ == "__main__":
+    # Development server; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
+    port = int(os.getenv("PORT", 5007))
+
+    init_worker()
+
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,94 @@
+from flask import Blueprint, request
+from controllers.dead_letter_controller import DeadLetterController
+
+dead_letter_bp = Blueprint('dead_letters', __name__)
+
+@dead_letter_bp.route('/logs/metrics', methods=['GET'])
+def get_ingest_metrics():
+    """
+    Števci razčlenjevanja logov in stanje dead-letter tabele
+    ---
+    tags:
+      - Dead letters
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: Začetni čas (vključno, ISO 8601), privzeto od začetka
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: Končni čas (izključno, ISO 8601)
+    responses:
+      200:
+        description: Števci parsed / fallback_json / failed in število neobdelanih dead letterjev
+        schema:
+          type: object
+          properties:
+            counters:
+              type: object
+              properties:
+                parsed:
+                  type: integer
+                  example: 12000
+                fallback_json:
+                  type: integer
+                  example: 340
+                failed:
+                  type: integer
+                  example: 5
+            dead_letters:
+              type: object
+              properties:
+                pending:
+                  type: integer
+                  example: 5
+                oldest:
+                  type: string
+      400:
+        description: Neveljavni parametri
+      500:
+        description: Napaka pri pridobivanju metrik
+    """
+    return DeadLetterController.get_metrics(request.args)
+
+@dead_letter_bp.route('/logs/dead-letters/reingest', methods=['POST'])
+def reingest_dead_letters():
+    """
+    Ponovno razčleni dead letterje (ovojnice razpakira znova) in uspešne shrani med loge
+    ---
+    tags:
+      - Dead letters
+    parameters:
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        default: 1000
+      - name: max_batches
+        in: query
+        type: integer
+        required: false
+        description: Največ toliko paketov v enem klicu (privzeto vsi)
+    responses:
+      200:
+        description: Rezultat ponovnega uvoza
+        schema:
+          type: object
+          properties:
+            batches:
+              type: integer
+            reingested:
+              type: integer
+            saved:
+              type: integer
+            still_failing:
+              type: integer
+      400:
+        description: Neveljavni parametri
+      500:
+        description: Napaka pri ponovnem uvozu
+    """
+    return DeadLetterController.reingest(request.args)
@@ -1,4 +1,4 @@
-from flask import Blueprint
+from flask import Blueprint, request
 from flasgger import swag_from
 from controllers.log_controller import LogController
 
@@ -28,6 +28,115 @@ def fetch_logs():
     """
     return LogController.fetch_and_save_logs()
 
+@log_bp.route('/logs/batch', methods=['POST'])
+def ingest_logs_batch():
+    """
+    Paketni uvoz logov preko HTTP (NDJSON ali kanonični format, po želji gzip)
+    ---
+    tags:
+      - Logs
+    consumes:
+      - application/x-ndjson
+      - text/plain
+      - application/gzip
+    parameters:
+      - name: Content-Encoding
+        in: header
+        type: string
+        required: false
+        description: gzip, če je telo stisnjeno (tudi več zaporednih gzip delov)
+      - name: body
+        in: body
+        required: true
+        description: Ena vrstica na log - JSON objekt ali "<timestamp> <LogType> <URL> Correlation: <id> [<service>] - <sporočilo>"
+        schema:
+          type: string
+          example: "2026-01-01 21:03:03,751 INFO http://localhost:5003/health Correlation: 3411af89 [payment-service] - Klic storitve GET /health"
+    responses:
+      201:
+        description: Število sprejetih in zavrnjenih vrstic, skupaj in po paketih
+        schema:
+          type: object
+          properties:
+            lines:
+              type: integer
+              example: 10000
+            accepted:
+              type: integer
+              example: 9998
+            rejected:
+              type: integer
+              example: 2
+            dropped:
+              type: integer
+              description: Vrstice, zavržene zaradi vzorčenja ali omejitve hitrosti (LOG_INGEST_POLICY)
+              example: 0
+            saved:
+              type: integer
+              example: 9998
+            duplicates:
+              type: integer
+              example: 0
+            batches:
+              type: array
+              items:
+                type: object
+      400:
+        description: Neveljavno ali prekinjeno gzip telo; paketi pred prekinitvijo so že shranjeni in vrnjeni z istimi števci kot pri 201
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+              example: "Invalid gzip body"
+            details:
+              type: string
+            saved:
+              type: integer
+              example: 5000
+            batches:
+              type: array
+              items:
+                type: object
+      500:
+        description: Napaka pri uvozu
+    """
+    return LogController.ingest_batch(request)
+
+@log_bp.route('/logs/tail', methods=['GET'])
+def tail_logs():
+    """
+    Sprotni tok novih logov (Server-Sent Events)
+    ---
+    tags:
+      - Logs
+    produces:
+      - text/event-stream
+    parameters:
+      - name: service_name
+        in: query
+        type: string
+        required: false
+        example: "payment-service"
+      - name: log_type
+        in: query
+        type: string
+        required: false
+        example: "ERROR"
+      - name: correlation_id
+        in: query
+        type: string
+        required: false
+    responses:
+      200:
+        description: Tok dogodkov "log", vsak s JSON logom v polju data
+      307:
+        description: Tok v tej namestitvi streže ločen proces (LOG_TAIL_MAX_VIEWERS=0), preusmeritev na LOG_TAIL_URL
+      503:
+        description: Doseženo največje število hkratnih gledalcev (LOG_TAIL_MAX_VIEWERS) v tem procesu
+    """
+    return LogController.tail_logs(request.args)
+
 @log_bp.route('/logs/<date_from>/<date_to>', methods=['GET'])
 def get_logs(date_from, date_to):
     """
@@ -48,6 +157,22 @@ def get_logs(date_from, date_to):
         required: true
         description: Končni datum (YYYY-MM-DD)
         example: "2026-01-31"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Velikost strani (privzeto in največ LOG_QUERY_MAX_LIMIT, 10000); naslednjo stran vrne next_cursor
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Vrednost next_cursor iz prejšnje strani (keyset paginacija po timestamp, id)
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [json, ndjson]
+        description: ndjson vrne vse zadetke kot tok vrstic (application/x-ndjson) brez omejitve velikosti
     responses:
       200:
         description: Seznam logov
@@ -63,6 +188,8 @@ def get_logs(date_from, date_to):
             date_to:
               type: string
               example: "2026-01-31"
+            next_cursor:
+              type: string
             logs:
               type: array
               items:
@@ -82,28 +209,333 @@ def get_logs(date_from, date_to):
                     type: string
                   message:
                     type: string
+                  fields:
+                    type: object
+                    description: Dodatna polja zapisa (npr. duration_ms, db_ms, status)
+      400:
+        description: Neveljaven datum ali cursor
+      500:
+        description: Napaka pri pridobivanju logov
+    """
+    return LogController.get_logs_by_date_range(date_from, date_to, request.args)
+
+@log_bp.route('/logs/query', methods=['GET'])
+def query_logs():
+    """
+    Poišči loge po časovnem intervalu [from, to) in filtrih
+    ---
+    tags:
+      - Logs
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: Začetni čas (vključno, ISO 8601)
+        example: "2026-01-01T00:00:00"
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: Končni čas (izključno, ISO 8601)
+        example: "2026-01-02T00:00:00"
+      - name: service_name
+        in: query
+        type: string
+        required: false
+        example: "payment-service"
+      - name: log_type
+        in: query
+        type: string
+        required: false
+        example: "ERROR"
+      - name: correlation_id
+        in: query
+        type: string
+        required: false
+        example: "3411af89"
+      - name: url_prefix
+        in: query
+        type: string
+        required: false
+        example: "http://localhost:5003/payments"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Velikost strani (privzeto 1000)
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Vrednost next_cursor iz prejšnje strani (keyset paginacija po timestamp, id)
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [json, ndjson]
+        description: ndjson vrne vse zadetke kot tok vrstic (application/x-ndjson) brez omejitve velikosti
+    responses:
+      200:
+        description: Seznam logov, urejen od najnovejšega
+        schema:
+          type: object
+          properties:
+            count:
+              type: integer
+              example: 10
+            next_cursor:
+              type: string
+            logs:
+              type: array
+              items:
+                type: object
+      400:
+        description: Neveljavni parametri
       500:
         description: Napaka pri pridobivanju logov
     """
-    return LogController.get_logs_by_date_range(date_from, date_to)
+    return LogController.query_logs(request.args)
+
+@log_bp.route('/logs/search', methods=['GET'])
+def search_logs():
+    """
+    Iskanje po vsebini sporočil logov
+    ---
+    tags:
+      - Logs
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: false
+        description: Iskanje po besedah (polnotekstno, websearch sintaksa)
+        example: "order 123"
+      - name: contains
+        in: query
+        type: string
+        required: false
+        description: Iskanje podniza v sporočilu (ne razlikuje velikih in malih črk)
+        example: "ORD-12"
+      - name: order
+        in: query
+        type: string
+        required: false
+        enum: [time, relevance]
+        default: time
+        description: relevance zahteva q in vrne samo eno stran zadetkov
+      - name: from
+        in: query
+        type: string
+        required: false
+        example: "2026-01-01T00:00:00"
+      - name: to
+        in: query
+        type: string
+        required: false
+        example: "2026-01-15T00:00:00"
+      - name: service_name
+        in: query
+        type: string
+        required: false
+      - name: log_type
+        in: query
+        type: string
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Vrednost next_cursor iz prejšnje strani (samo za order=time)
+    responses:
+      200:
+        description: Najdeni logi
+        schema:
+          type: object
+          properties:
+            count:
+              type: integer
+            next_cursor:
+              type: string
+            logs:
+              type: array
+              items:
+                type: object
+      400:
+        description: Manjka q ali contains oziroma neveljavni parametri
+      500:
+        description: Napaka pri iskanju
+    """
+    return LogController.search_logs(request.args)
+
+@log_bp.route('/logs/stats', methods=['GET'])
+def get_log_stats():
+    """
+    Število logov po storitvi in tipu (INFO/WARN/ERROR) v časovnih intervalih
+    ---
+    tags:
+      - Logs
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: Začetni čas (vključno, ISO 8601), privzeto eno uro pred "to"
+        example: "2026-01-01T00:00:00"
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: Končni čas (izključno, ISO 8601), privzeto zdaj
+        example: "2026-01-01T01:00:00"
+      - name: bucket
+        in: query
+        type: string
+        required: false
+        enum: [minute, hour, day]
+        default: minute
+      - name: service_name
+        in: query
+        type: string
+        required: false
+        example: "payment-service"
+      - name: log_type
+        in: query
+        type: string
+        required: false
+        example: "ERROR"
+    responses:
+      200:
+        description: Agregirane vrednosti iz tabele log_stats_minute
+        schema:
+          type: object
+          properties:
+            bucket:
+              type: string
+              example: "minute"
+            totals:
+              type: object
+              example: {"INFO": 120, "ERROR": 3}
+            dropped:
+              type: object
+              description: Vrstice, ki jih je politika vnosa zavrgla (vzorčenje, omejitev hitrosti)
+              example: {"INFO": 480}
+            stats:
+              type: array
+              items:
+                type: object
+                properties:
+                  bucket:
+                    type: string
+                  service_name:
+                    type: string
+                  log_type:
+                    type: string
+                  count:
+                    type: integer
+                  dropped:
+                    type: integer
+      400:
+        description: Neveljavni parametri
+      500:
+        description: Napaka pri pridobivanju statistike
+    """
+    return LogController.get_stats(request.args)
 
 @log_bp.route('/logs', methods=['DELETE'])
 def delete_logs():
     """
-    Izbriši vse loge iz baze
+    Izbriši loge iz baze (vse ali samo starejše od older_than)
     ---
     tags:
       - Logs
+    parameters:
+      - name: older_than
+        in: query
+        type: string
+        required: false
+        description: Izbriši samo dnevne particije, starejše od podanega števila dni (npr. 30d)
+        example: "30d"
     responses:
       200:
-        description: Vsi logi uspešno izbrisani
+        description: Logi uspešno izbrisani
         schema:
           type: object
           properties:
             message:
               type: string
               example: "All logs deleted successfully"
+            cutoff:
+              type: string
+              example: "2026-01-01"
+            dropped_partitions:
+              type: array
+              items:
+                type: string
+                example: "logs_20251201"
+            deleted_archives:
+              type: array
+              items:
+                type: string
+                example: "2025/12/logs_20251201_3f9a1c2e.parquet"
+      400:
+        description: Neveljavna vrednost older_than
       500:
         description: Napaka pri brisanju logov
     """
-    return LogController.delete_all_logs()
\ No newline at end of file
+    older_than = request.args.get('older_than')
+    if older_than:
+        return LogController.delete_logs_older_than(older_than)
+    return LogController.delete_all_logs()
+
+@log_bp.route('/logs/archive', methods=['POST'])
+def archive_logs():
+    """
+    Prestavi zaprte dnevne particije, starejše od older_than, v stisnjene Parquet datoteke
+    ---
+    tags:
+      - Logs
+    parameters:
+      - name: older_than
+        in: query
+        type: string
+        required: false
+        description: Število dni, ki ostanejo v bazi (npr. 7d), privzeto LOG_HOT_DAYS
+        example: "7d"
+    responses:
+      200:
+        description: Particije izvožene in odstranjene iz baze; poizvedbe jih še naprej berejo iz arhiva
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "Old logs archived successfully"
+            cutoff:
+              type: string
+              example: "2026-01-01"
+            exported:
+              type: array
+              items:
+                type: object
+                properties:
+                  partition:
+                    type: string
+                    example: "logs_20251201"
+                  rows:
+                    type: integer
+                    example: 182340
+                  path:
+                    type: string
+                    example: "2025/12/logs_20251201_3f9a1c2e.parquet"
+      400:
+        description: Neveljavna vrednost older_than
+      500:
+        description: Napaka pri arhiviranju (npr. pyarrow ni nameščen)
+    """
+    return LogController.archive_logs(request.args)
@@ -0,0 +1,71 @@
+from flask import Blueprint
+from controllers.trace_controller import TraceController
+
+trace_bp = Blueprint('traces', __name__)
+
+@trace_bp.route('/traces/<correlation_id>', methods=['GET'])
+def get_trace(correlation_id):
+    """
+    Časovnica klica preko vseh storitev za podan correlation ID
+    ---
+    tags:
+      - Traces
+    parameters:
+      - name: correlation_id
+        in: path
+        type: string
+        required: true
+        example: "3411af89"
+    responses:
+      200:
+        description: Urejeni logi z zakasnitvijo med posameznimi koraki
+        schema:
+          type: object
+          properties:
+            correlation_id:
+              type: string
+            start:
+              type: string
+            end:
+              type: string
+            duration_ms:
+              type: number
+              example: 42.5
+            services:
+              type: array
+              items:
+                type: string
+                example: "payment-service"
+            count:
+              type: integer
+            truncated:
+              type: boolean
+            hops:
+              type: array
+              items:
+                type: object
+                properties:
+                  timestamp:
+                    type: string
+                  service_name:
+                    type: string
+                  log_type:
+                    type: string
+                  url:
+                    type: string
+                  message:
+                    type: string
+                  fields:
+                    type: object
+                  offset_ms:
+                    type: number
+                  latency_ms:
+                    type: number
+                  service_changed:
+                    type: boolean
+      404:
+        description: Za correlation ID ni logov
+      500:
+        description: Napaka pri pridobivanju sledi
+    """
+    return TraceController.get_trace(correlation_id)
@@ -0,0 +1,407 @@
+from db.db import db_connection, get_db_cursor
+from services.partition_service import PartitionService
+from datetime import date, timedelta
+from functools import reduce
+import heapq
+import json
+import operator
+import os
+import re
+import uuid
+from psycopg2.extras import execute_values
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', '/var/lib/logging-service/archive')
+# Days kept in Postgres, closed days older than this are moved to Parquet files
+LOG_HOT_DAYS = int(os.getenv('LOG_HOT_DAYS', 7))
+LOG_ARCHIVE_ROW_GROUP_SIZE = int(os.getenv('LOG_ARCHIVE_ROW_GROUP_SIZE', 50000))
+LOG_ARCHIVE_COMPRESSION = os.getenv('LOG_ARCHIVE_COMPRESSION', 'zstd')
+LOG_ARCHIVE_READ_BATCH_SIZE = int(os.getenv('LOG_ARCHIVE_READ_BATCH_SIZE', 2000))
+# How long swapping a written-out day for its file may wait for locks on logs, in seconds
+LOG_ARCHIVE_LOCK_TIMEOUT = float(os.getenv('LOG_ARCHIVE_LOCK_TIMEOUT', 5))
+# Exports of a day that keeps receiving late rows are redone this many times before giving up
+LOG_ARCHIVE_EXPORT_ATTEMPTS = int(os.getenv('LOG_ARCHIVE_EXPORT_ATTEMPTS', 3))
+
+ARCHIVE_COLUMNS = ('id', 'timestamp', 'log_type', 'url', 'correlation_id', 'service_name', 'message', 'fields', 'created_at')
+
+if pa is not None:
+    ARCHIVE_SCHEMA = pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us')),
+        ('log_type', pa.string()),
+        ('url', pa.string()),
+        ('correlation_id', pa.string()),
+        ('service_name', pa.string()),
+        ('message', pa.string()),
+        # logs.fields as JSON text
+        ('fields', pa.string()),
+        ('created_at', pa.timestamp('us'))
+    ])
+    # Recorded in the file metadata; files without it (older exports, sorted by service first) are read whole
+    ARCHIVE_SORTING = (pq.SortingColumn(ARCHIVE_COLUMNS.index('timestamp')), pq.SortingColumn(ARCHIVE_COLUMNS.index('id')))
+
+class ArchiveService:
+    @staticmethod
+    def available():
+        return pq is not None
+
+    @staticmethod
+    def _require_pyarrow():
+        if pq is None:
+            raise RuntimeError('pyarrow is not installed, log archiving is unavailable')
+
+    @staticmethod
+    def _reattach_detached_tables():
+        # Day tables left detached by an interrupted export of an older version: back under logs, so
+        # queries, retention and late rows see them again, and exported by this run like any other day
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    """
+                    SELECT relname AS name
+                    FROM pg_class
+                    WHERE relkind = 'r' AND NOT relispartition AND relname ~ '^logs_[0-9]{8}$'
+                    ORDER BY relname
+                    """
+                )
+                names = [row['name'] for row in cursor.fetchall()]
+                for name in names:
+                    day = PartitionService.partition_day(name)
+                    cursor.execute(
+                        f'ALTER TABLE logs ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                        (day, day + timedelta(days=1))
+                    )
+                conn.commit()
+                return names
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _write_parquet(cursor, path):
+        writer = pq.ParquetWriter(path, ARCHIVE_SCHEMA, compression=LOG_ARCHIVE_COMPRESSION, sorting_columns=ARCHIVE_SORTING)
+        try:
+            while True:
+                rows = cursor.fetchmany(LOG_ARCHIVE_ROW_GROUP_SIZE)
+                if not rows:
+                    break
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), ARCHIVE_SCHEMA)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=ARCHIVE_SCHEMA))
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_day(conn, name, path):
+        """Writes the partition to path in one snapshot; returns the per-service stats the manifest needs."""
+        cursor = get_db_cursor(conn)
+        try:
+            # Stats and export read the same snapshot, so the row counts match the file exactly
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute(
+                f"""
+                SELECT COALESCE(s.name, '') AS service_name, COUNT(*) AS row_count,
+                       MIN(l.timestamp) AS min_timestamp, MAX(l.timestamp) AS max_timestamp
+                FROM "{name}" l
+                LEFT JOIN log_services s ON s.id = l.service_id
+                GROUP BY 1
+                """
+            )
+            services = cursor.fetchall()
+
+            if services:
+                # Sorted like the query layer reads, so iter_logs can stream row groups backwards and
+                # row group statistics let time filters skip whole row groups
+                export_cursor = conn.cursor(name=f'logs_export_{uuid.uuid4().hex}')
+                try:
+                    # Read from the day table itself rather than logs_view, the lookups are joined here;
+                    # Parquet dictionary-encodes the decoded strings on its own
+                    export_cursor.execute(
+                        f"""
+                        SELECT l.id, l.timestamp, lv.name, u.path || COALESCE(l.url_query, ''),
+                               l.correlation_id, s.name, l.message, l.fields::text, l.created_at
+                        FROM "{name}" l
+                        LEFT JOIN log_levels lv ON lv.id = l.level_id
+                        LEFT JOIN log_services s ON s.id = l.service_id
+                        LEFT JOIN log_urls u ON u.id = l.url_id
+                        ORDER BY l.timestamp, l.id
+                        """
+                    )
+                    ArchiveService._write_parquet(export_cursor, path + '.tmp')
+                finally:
+                    export_cursor.close()
+                os.replace(path + '.tmp', path)
+
+            conn.commit()
+            return services
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _swap_day(conn, name, day, relative_path, services):
+        """Replaces the partition with its file; False when rows arrived after the export and it has to be redone."""
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute(f"SET LOCAL lock_timeout = '{int(LOG_ARCHIVE_LOCK_TIMEOUT * 1000)}ms'")
+            # Detached before anything else locks the day, so the locks are taken in the order inserts take
+            # them (logs, then the partition); late rows for the day wait from here until commit and then
+            # land in the fresh partition created below
+            cursor.execute(f'ALTER TABLE logs DETACH PARTITION "{name}"')
+            cursor.execute(f'SELECT COUNT(*) AS row_count FROM "{name}"')
+            if cursor.fetchone()['row_count'] != sum(s['row_count'] for s in services):
+                conn.rollback()
+                return False
+
+            execute_values(
+                cursor,
+                """
+                INSERT INTO log_archive_manifest (day, service_name, path, row_count, min_timestamp, max_timestamp)
+                VALUES %s
+                """,
+                [(day, s['service_name'], relative_path, s['row_count'], s['min_timestamp'], s['max_timestamp']) for s in services]
+            )
+            # Manifest rows and the drop commit together, the data is never in both places or neither;
+            # the day gets an empty partition back so late rows still have somewhere to go, they are
+            # exported to an extra file for the day on a later run
+            cursor.execute(f'DROP TABLE "{name}"')
+            cursor.execute("SELECT ensure_log_partition(%s)", (day,))
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _export_partition(name, day):
+        relative_path = os.path.join(day.strftime('%Y'), day.strftime('%m'), f"{name}_{uuid.uuid4().hex[:8]}.parquet")
+        path = os.path.join(LOG_ARCHIVE_DIR, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # The partition stays attached while it is written out, so the day stays queryable and a failed
+        # export leaves it exactly as it was
+        with db_connection() as conn:
+            try:
+                for _ in range(LOG_ARCHIVE_EXPORT_ATTEMPTS):
+                    services = ArchiveService._write_day(conn, name, path)
+                    if not services:
+                        # Nothing to move; an archived day keeps its empty partition for late rows
+                        return None
+                    if ArchiveService._swap_day(conn, name, day, relative_path, services):
+                        return {
+                            'partition': name,
+                            'rows': sum(s['row_count'] for s in services),
+                            'path': relative_path
+                        }
+                raise RuntimeError(f'{name} kept receiving rows during {LOG_ARCHIVE_EXPORT_ATTEMPTS} export attempts')
+            except Exception as e:
+                for leftover in (path + '.tmp', path):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                raise e
+
+    @staticmethod
+    def export_older_than(days=None):
+        ArchiveService._require_pyarrow()
+        days = LOG_HOT_DAYS if days is None else days
+        cutoff = date.today() - timedelta(days=days)
+
+        ArchiveService._reattach_detached_tables()
+
+        exported = []
+        for name, day in PartitionService.list_partitions():
+            if day + timedelta(days=1) <= cutoff:
+                result = ArchiveService._export_partition(name, day)
+                if result:
+                    exported.append(result)
+
+        return cutoff, exported
+
+    @staticmethod
+    def archived_days(filters):
+        """Archived days overlapping the filters, newest first, as (day, paths, max_timestamp)."""
+        if pq is None:
+            return []
+
+        conditions, params = [], []
+        if filters.get('from'):
+            conditions.append('max_timestamp >= %s')
+            params.append(filters['from'])
+        if filters.get('to'):
+            conditions.append('min_timestamp < %s')
+            params.append(filters['to'])
+        if filters.get('service_name'):
+            conditions.append('service_name = %s')
+            params.append(filters['service_name'])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    f"""
+                    SELECT day, array_agg(DISTINCT path) AS paths, MAX(max_timestamp) AS max_timestamp
+                    FROM log_archive_manifest
+                    {where}
+                    GROUP BY day
+                    ORDER BY day DESC
+                    """,
+                    params
+                )
+                return [(row['day'], row['paths'], row['max_timestamp']) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _filter_expression(filters, after):
+        conditions = []
+
+        # Plain comparisons are checked against row group statistics, so whole row groups are skipped
+        if filters.get('from'):
+            conditions.append(pc.field('timestamp') >= filters['from'])
+        if filters.get('to'):
+            conditions.append(pc.field('timestamp') < filters['to'])
+        for column in ('service_name', 'log_type', 'correlation_id'):
+            if filters.get(column):
+                conditions.append(pc.field(column) == filters[column])
+        if filters.get('url_prefix'):
+            conditions.append(pc.starts_with(pc.field('url'), pattern=filters['url_prefix']))
+        # Approximates websearch_to_tsquery('simple', q): every word of q must appear as a whole word
+        if filters.get('q'):
+            for word in re.findall(r'\w+', filters['q']):
+                conditions.append(pc.match_substring_regex(pc.field('message'), pattern=rf'\b{re.escape(word)}\b', ignore_case=True))
+        if filters.get('contains'):
+            conditions.append(pc.match_substring(pc.field('message'), pattern=filters['contains'], ignore_case=True))
+
+        if after:
+            timestamp, log_id = after
+            conditions.append((pc.field('timestamp') < timestamp) | ((pc.field('timestamp') == timestamp) & (pc.field('id') < log_id)))
+
+        return reduce(operator.and_, conditions) if conditions else None
+
+    @staticmethod
+    def iter_logs(filters, after, days):
+        """Yields archived rows for the given archived days in (timestamp, id) DESC order."""
+        expression = ArchiveService._filter_expression(filters, after)
+        bounds = ArchiveService._statistics_bounds(filters, after)
+
+        for _, paths, _ in days:
+            # A day has more than one file only when late rows were exported after it
+            streams = [ArchiveService._iter_file(path, expression, bounds) for path in paths]
+            yield from streams[0] if len(streams) == 1 else heapq.merge(
+                *streams, key=lambda row: (row['timestamp'], row['id']), reverse=True
+            )
+
+    @staticmethod
+    def _statistics_bounds(filters, after):
+        # (column, min allowed, max allowed, max inclusive) checked against row group min/max statistics
+        bounds = []
+        if filters.get('from'):
+            bounds.append(('timestamp', filters['from'], None, True))
+        if filters.get('to'):
+            bounds.append(('timestamp', None, filters['to'], False))
+        if after:
+            bounds.append(('timestamp', None, after[0], True))
+        for column in ('service_name', 'log_type', 'correlation_id'):
+            if filters.get(column):
+                bounds.append((column, filters[column], filters[column], True))
+        return bounds
+
+    @staticmethod
+    def _may_match(row_group, bounds):
+        for column, low, high, inclusive in bounds:
+            statistics = row_group.column(ARCHIVE_COLUMNS.index(column)).statistics
+            if statistics is None or not statistics.has_min_max:
+                continue
+            if low is not None and statistics.max < low:
+                return False
+            if high is not None and (statistics.min > high or (not inclusive and statistics.min == high)):
+                return False
+        return True
+
+    @staticmethod
+    def _iter_file(path, expression, bounds):
+        path = os.path.join(LOG_ARCHIVE_DIR, path)
+        parquet = pq.ParquetFile(path, memory_map=True)
+        metadata = parquet.metadata
+        if metadata.num_row_groups and metadata.row_group(0).sorting_columns != ARCHIVE_SORTING:
+            yield from ArchiveService._rows(ArchiveService._read_archive(path, expression))
+            return
+
+        # Row groups whose statistics can't match the filter are skipped; the rest are decoded from the
+        # memory-mapped file one at a time, newest first, so memory stays at one row group however large the day is
+        for index in reversed(range(metadata.num_row_groups)):
+            if not ArchiveService._may_match(metadata.row_group(index), bounds):
+                continue
+            table = parquet.read_row_group(index, columns=list(ARCHIVE_COLUMNS))
+            if expression is not None:
+                table = table.filter(expression)
+            if not len(table):
+                continue
+            yield from ArchiveService._rows(table.take(pa.array(range(len(table) - 1, -1, -1))))
+
+    @staticmethod
+    def _rows(table):
+        for batch in table.to_batches(max_chunksize=LOG_ARCHIVE_READ_BATCH_SIZE):
+            for row in batch.to_pylist():
+                if row['fields'] is not None:
+                    row['fields'] = json.loads(row['fields'])
+                yield row
+
+    @staticmethod
+    def _read_archive(path, expression):
+        # Files exported before logs.fields existed don't have the column, it reads as null there
+        present = set(pq.read_schema(path).names)
+        # Memory-mapped reads; only the row groups and columns that survive the filter are decoded
+        table = pq.read_table(path, columns=[c for c in ARCHIVE_COLUMNS if c in present], filters=expression, memory_map=True)
+        for field in ARCHIVE_SCHEMA:
+            if field.name not in present:
+                table = table.append_column(field, pa.nulls(len(table), type=field.type))
+        return table.select(list(ARCHIVE_COLUMNS)).sort_by([('timestamp', 'descending'), ('id', 'descending')])
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(os.path.join(LOG_ARCHIVE_DIR, path))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _delete_manifest(where, params):
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(f"DELETE FROM log_archive_manifest {where} RETURNING path", params)
+                paths = sorted({row['path'] for row in cursor.fetchall()})
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+        # Files go only after the manifest no longer points at them
+        ArchiveService._remove_files(paths)
+        return paths
+
+    @staticmethod
+    def delete_older_than(cutoff):
+        return ArchiveService._delete_manifest("WHERE day < %s", (cutoff,))
+
+    @staticmethod
+    def delete_all():
+        return ArchiveService._delete_manifest("", ())
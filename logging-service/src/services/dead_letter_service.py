@@ -0,0 +1,163 @@
+from db.db import db_connection, get_db_cursor
+from services.log_service import LogService
+from services.partition_service import PartitionService
+from services.dictionary_service import DictionaryService
+from utils.log_parser import parse_log_message, dead_letter, FAILED
+from utils.log_envelope import RejectedMessage, unpack_dead_letter
+from psycopg2.extras import execute_values
+import os
+
+DEAD_LETTER_REINGEST_BATCH_SIZE = int(os.getenv('DEAD_LETTER_REINGEST_BATCH_SIZE', 1000))
+
+class DeadLetterService:
+    @staticmethod
+    def _read_batch(last_id, batch_size):
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    """
+                    SELECT id, raw_payload, message_id, content_type, content_encoding
+                    FROM log_dead_letters
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                    """,
+                    (last_id, batch_size)
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _reingest_batch(last_id, batch_size):
+        dead_letters = DeadLetterService._read_batch(last_id, batch_size)
+        if not dead_letters:
+            return None
+
+        # entries are (dead letter id, log); replaced are the dead letters that parsed and get deleted
+        entries, replaced, failures, split = [], [], [], []
+        for dead_letter_row in dead_letters:
+            # An envelope that failed as a whole is unpacked again from its stored properties
+            messages = unpack_dead_letter(
+                bytes(dead_letter_row['raw_payload']), dead_letter_row['message_id'],
+                dead_letter_row['content_type'], dead_letter_row['content_encoding']
+            )
+            if len(messages) == 1 and isinstance(messages[0][0], RejectedMessage):
+                failures.append((dead_letter_row['id'], messages[0][0].error))
+                continue
+
+            results = [(body, message_id, *parse_log_message(body, message_id)) for body, message_id in messages]
+            if dead_letter_row['content_type'] is None and results[0][3] == FAILED:
+                failures.append((dead_letter_row['id'], results[0][4]))
+                continue
+
+            # Records of an unpacked envelope that still fail become dead letters of their own
+            replaced.append(dead_letter_row['id'])
+            for body, message_id, log_data, kind, error in results:
+                if kind == FAILED:
+                    split.append((dead_letter_row['id'], dead_letter(body, message_id, error)))
+                else:
+                    entries.append((dead_letter_row['id'], log_data))
+
+        # Dictionary keys and partitions are created before the locking transaction, like in save_logs,
+        # so a re-ingest never holds two pooled connections
+        rows = DictionaryService.encode_rows(LogService.normalize_batch([log for _, log in entries])) if entries else []
+        PartitionService.ensure_partitions(LogService.partition_days(rows))
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                # SKIP LOCKED lets two re-ingest runs work side by side; rows the other run holds (or already
+                # deleted) are left to it
+                cursor.execute(
+                    "SELECT id FROM log_dead_letters WHERE id = ANY(%s) FOR UPDATE SKIP LOCKED",
+                    ([dead_letter_row['id'] for dead_letter_row in dead_letters],)
+                )
+                locked = {row['id'] for row in cursor.fetchall()}
+
+                reingested = [dead_letter_id for dead_letter_id in replaced if dead_letter_id in locked]
+                failures = [failure for failure in failures if failure[0] in locked]
+
+                saved_count = 0
+                if reingested:
+                    saved_count = LogService.write_rows(
+                        cursor, [row for (dead_letter_id, _), row in zip(entries, rows) if dead_letter_id in locked]
+                    )
+                    split_letters = [letter for dead_letter_id, letter in split if dead_letter_id in locked]
+                    if split_letters:
+                        LogService.write_dead_letters(cursor, split_letters)
+                    cursor.execute("DELETE FROM log_dead_letters WHERE id = ANY(%s)", (reingested,))
+
+                if failures:
+                    execute_values(
+                        cursor,
+                        """
+                        UPDATE log_dead_letters AS d
+                        SET error = v.error, reingest_attempts = d.reingest_attempts + 1, last_attempt_at = NOW()
+                        FROM (VALUES %s) AS v(id, error)
+                        WHERE d.id = v.id
+                        """,
+                        failures
+                    )
+
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+        return dead_letters[-1]['id'], len(reingested), saved_count, len(failures)
+
+    @staticmethod
+    def reingest(batch_size=None, max_batches=None):
+        batch_size = batch_size or DEAD_LETTER_REINGEST_BATCH_SIZE
+        result = {'batches': 0, 'reingested': 0, 'saved': 0, 'still_failing': 0}
+
+        last_id = 0
+        while max_batches is None or result['batches'] < max_batches:
+            batch = DeadLetterService._reingest_batch(last_id, batch_size)
+            if batch is None:
+                break
+
+            last_id, reingested, saved, failed = batch
+            result['batches'] += 1
+            result['reingested'] += reingested
+            result['saved'] += saved
+            result['still_failing'] += failed
+
+        return result
+
+    @staticmethod
+    def get_metrics(date_from=None, date_to=None):
+        conditions, params = [], []
+        if date_from:
+            conditions.append('minute >= %s')
+            params.append(date_from)
+        if date_to:
+            conditions.append('minute < %s')
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    f"""
+                    SELECT COALESCE(SUM(parsed), 0)::BIGINT AS parsed,
+                           COALESCE(SUM(fallback_json), 0)::BIGINT AS fallback_json,
+                           COALESCE(SUM(failed), 0)::BIGINT AS failed
+                    FROM log_parse_stats_minute
+                    {where}
+                    """,
+                    params
+                )
+                counters = dict(cursor.fetchone())
+
+                cursor.execute("SELECT COUNT(*) AS pending, MIN(received_at) AS oldest FROM log_dead_letters")
+                dead_letters = dict(cursor.fetchone())
+            finally:
+                cursor.close()
+
+        return counters, dead_letters
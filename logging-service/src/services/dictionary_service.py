@@ -0,0 +1,85 @@
+from db.db import db_connection, get_db_cursor
+from utils.lru_cache import LRUCache
+import os
+
+DICTIONARY_CACHE_SIZE = int(os.getenv('DICTIONARY_CACHE_SIZE', 100000))
+
+# kind -> (lookup table, value column)
+DICTIONARIES = {
+    'service': ('log_services', 'name'),
+    'level': ('log_levels', 'name'),
+    'url': ('log_urls', 'path')
+}
+
+class DictionaryService:
+    # Ids are never reassigned, so cached entries only leave on eviction
+    _caches = {kind: LRUCache(max_size=DICTIONARY_CACHE_SIZE, ttl=float('inf')) for kind in DICTIONARIES}
+
+    @staticmethod
+    def split_url(url):
+        # Only the path is dictionary-encoded; the query string differs per request and stays inline
+        if url is None:
+            return None, None
+        path, separator, query = url.partition('?')
+        return path, (separator + query) if separator else None
+
+    @staticmethod
+    def _load(kind, values):
+        table, column = DICTIONARIES[kind]
+
+        # Runs in its own short transaction, like partition creation: an id is only cached once it is committed
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                # Sorted inserts, so concurrent ingesters adding the same new values can't deadlock
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} ({column})
+                    SELECT value FROM unnest(%s::text[]) AS value ORDER BY value
+                    ON CONFLICT ({column}) DO NOTHING
+                    """,
+                    (sorted(values),)
+                )
+                cursor.execute(f"SELECT id, {column} AS value FROM {table} WHERE {column} = ANY(%s)", (list(values),))
+                ids = {row['value']: row['id'] for row in cursor.fetchall()}
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+        return ids
+
+    @staticmethod
+    def resolve(kind, values):
+        """Maps each value to its integer key, creating keys for values seen for the first time."""
+        cache = DictionaryService._caches[kind]
+        ids, missing = {}, set()
+        for value in values:
+            if value is None:
+                continue
+            key = cache.get(value)
+            if key is None:
+                missing.add(value)
+            else:
+                ids[value] = key
+
+        if missing:
+            for value, key in DictionaryService._load(kind, missing).items():
+                cache.set(value, key)
+                ids[value] = key
+        return ids
+
+    @staticmethod
+    def encode_rows(rows):
+        """(timestamp, log_type, url, correlation_id, service_name, message, dedup_key, fields) rows to the stored logs columns."""
+        urls = [DictionaryService.split_url(row[2]) for row in rows]
+        levels = DictionaryService.resolve('level', {row[1] for row in rows})
+        services = DictionaryService.resolve('service', {row[4] for row in rows})
+        paths = DictionaryService.resolve('url', {path for path, _ in urls})
+
+        return [
+            (timestamp, levels.get(log_type), paths.get(path), query, correlation_id, services.get(service_name), message, dedup_key, fields)
+            for (timestamp, log_type, _, correlation_id, service_name, message, dedup_key, fields), (path, query) in zip(rows, urls)
+        ]
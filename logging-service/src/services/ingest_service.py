@@ -0,0 +1,59 @@
+from services.log_service import LogService
+from utils.line_stream import iter_lines
+from utils.log_parser import parse_batch
+import os
+import zlib
+
+HTTP_INGEST_BATCH_SIZE = int(os.getenv('HTTP_INGEST_BATCH_SIZE', 5000))
+HTTP_INGEST_MAX_LINE_LENGTH = int(os.getenv('HTTP_INGEST_MAX_LINE_LENGTH', 1024 * 1024))
+
+class IngestService:
+    @staticmethod
+    def _save(messages, oversized):
+        batch = parse_batch(messages)
+        saved = LogService.save_parsed_batch(batch)
+        accepted = len(batch.logs)
+        return {
+            'lines': len(messages) + oversized,
+            'accepted': accepted,
+            'rejected': len(batch.dead_letters) + oversized,
+            'dropped': sum(batch.dropped.values()),
+            'saved': saved,
+            'duplicates': accepted - saved
+        }
+
+    @staticmethod
+    def _totals(batches):
+        return {
+            key: sum(batch[key] for batch in batches)
+            for key in ('lines', 'accepted', 'rejected', 'dropped', 'saved', 'duplicates')
+        }
+
+    @staticmethod
+    def ingest_stream(stream, gzip=False, batch_size=None):
+        batch_size = batch_size or HTTP_INGEST_BATCH_SIZE
+        batches = []
+        messages = []
+        oversized = 0
+
+        # Lines are written batch by batch as they are decoded, the body is never held in memory as a whole
+        try:
+            for line, too_long in iter_lines(stream, gzip, HTTP_INGEST_MAX_LINE_LENGTH):
+                if too_long:
+                    oversized += 1
+                    continue
+                if not line.strip():
+                    continue
+                messages.append((line, None))
+                if len(messages) >= batch_size:
+                    batches.append(IngestService._save(messages, oversized))
+                    messages, oversized = [], 0
+        except zlib.error as e:
+            # Batches before the cut are already committed; the caller reports them with the error
+            e.totals, e.batches = IngestService._totals(batches), batches
+            raise e
+
+        if messages or oversized:
+            batches.append(IngestService._save(messages, oversized))
+
+        return IngestService._totals(batches), batches
@@ -1,80 +1,443 @@
-from db.db import get_db_connection, get_db_cursor
+from db.db import db_connection, get_db_cursor
+from services.partition_service import PartitionService
+from services.archive_service import ArchiveService
+from services.dictionary_service import DictionaryService
 from datetime import datetime
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import os
+import re
+import uuid
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from utils.log_parser import PARSED, FALLBACK_JSON, FAILED
+from utils.log_tail import LOG_TAIL_CHANNEL
+from utils.ingest_policy import ingest_policy
+
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 5000))
+
+LOG_TAIL_NOTIFY = os.getenv('LOG_TAIL_NOTIFY', 'true').lower() == 'true'
+
+# Stored columns of logs; service, level and URL path are integer keys into the lookup tables
+LOG_COLUMNS = ('timestamp', 'level_id', 'url_id', 'url_query', 'correlation_id', 'service_id', 'message', 'dedup_key', 'fields')
+
+LOG_NULLABLE_COLUMNS = tuple(column for column in LOG_COLUMNS if column not in ('timestamp', 'level_id', 'dedup_key'))
+
+# logs_view joins the lookup tables back, so readers still see log_type, url and service_name
+LOG_SELECT_COLUMNS = 'id, timestamp, log_type, url, correlation_id, service_name, message, fields, created_at'
+
+# Keys of a parsed log that have their own column; anything else a producer sent is kept in logs.fields
+LOG_RECORD_KEYS = frozenset(('timestamp', 'log_type', 'url', 'correlation_id', 'service_name', 'message', 'message_id'))
+
+# Postgres parses ISO timestamps itself during COPY, anything else falls back to the batch time
+ISO_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?$')
+
+LOG_QUERY_MAX_LIMIT = int(os.getenv('LOG_QUERY_MAX_LIMIT', 10000))
+
+LOG_STREAM_ITERSIZE = int(os.getenv('LOG_STREAM_ITERSIZE', 2000))
+
+# Rows without a usable timestamp get the ingest time, so a redelivery lands on a different timestamp and
+# ON CONFLICT (dedup_key, timestamp) can't catch it. When such a row has a delivery id (AMQP message_id,
+# envelope id plus index) its key carries this prefix, and the insert skips it when the same key was stored
+# within LOG_INGEST_DEDUP_HOURS before. Without an id nothing tells a redelivery from a repeated event
+# (e.g. a heartbeat), so those rows are never deduplicated
+INGEST_TIME_KEY_PREFIX = 'ingest:'
+LOG_INGEST_DEDUP_HOURS = int(os.getenv('LOG_INGEST_DEDUP_HOURS', 24))
+DEDUP_KEY_WIDTH = 64
 
 class LogService:
     @staticmethod
-    def save_logs(logs):
-        conn = get_db_connection()
-        cursor = get_db_cursor(conn)
-        
+    def normalize_batch(logs):
+        now = datetime.now().isoformat()
+        rows = []
+
+        for log in logs:
+            timestamp = log.get('timestamp')
+            stamped = False
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.isoformat()
+            elif not isinstance(timestamp, str) or not ISO_TIMESTAMP.match(timestamp):
+                timestamp, stamped = now, True
+
+            rows.append((
+                timestamp,
+                log.get('log_type'),
+                log.get('url'),
+                log.get('correlation_id'),
+                log.get('service_name'),
+                log.get('message'),
+                LogService._dedup_key(log, timestamp, stamped),
+                LogService._extra_fields(log)
+            ))
+
+        return rows
+
+    @staticmethod
+    def _extra_fields(log):
+        fields = {key: value for key, value in log.items() if key not in LOG_RECORD_KEYS}
+        return json.dumps(fields, ensure_ascii=False, default=str) if fields else None
+
+    @staticmethod
+    def _dedup_key(log, timestamp, stamped):
+        prefix = INGEST_TIME_KEY_PREFIX if stamped else ''
+        key = log.get('message_id')
+        if not key:
+            if stamped:
+                return uuid.uuid4().hex
+            return LogService._content_hash(timestamp, log.get('service_name'), log.get('correlation_id'), log.get('message'))
+        if len(prefix) + len(key) > DEDUP_KEY_WIDTH:
+            key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return prefix + key
+
+    @staticmethod
+    def _content_hash(timestamp, service_name, correlation_id, message):
+        key = '\x1f'.join(str(value) if value is not None else '' for value in (timestamp, service_name, correlation_id, message))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _copy_rows(cursor, rows):
+        # csv writes None as a quoted empty string, which COPY only reads as NULL in FORCE_NULL columns;
+        # an empty string in those columns is stored as NULL as well
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        buffer.seek(0)
+
+        # COPY can't skip duplicates, so rows go through a staging table and are merged with ON CONFLICT
+        cursor.copy_expert(
+            f"COPY logs_staging ({', '.join(LOG_COLUMNS)}) FROM STDIN "
+            f"WITH (FORMAT csv, FORCE_NULL ({', '.join(LOG_NULLABLE_COLUMNS)}))",
+            buffer
+        )
+        # Only rows that were actually inserted (not duplicates) are added to the per-minute rollup;
+        # rollup rows are upserted in key order so concurrent ingesters lock them in the same order.
+        # Rows stamped with the ingest time are looked up by key (idx_logs_dedup_key) in the window before it
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO logs ({', '.join(LOG_COLUMNS)})
+                SELECT {', '.join(LOG_COLUMNS)} FROM logs_staging s
+                WHERE s.dedup_key NOT LIKE '{INGEST_TIME_KEY_PREFIX}%' OR NOT EXISTS (
+                    SELECT 1 FROM logs l
+                    WHERE l.dedup_key = s.dedup_key
+                      AND l.timestamp >= s.timestamp - make_interval(hours => {LOG_INGEST_DEDUP_HOURS})
+                      AND l.timestamp < s.timestamp
+                )
+                ON CONFLICT (dedup_key, timestamp) DO NOTHING
+                RETURNING id, timestamp, service_id, level_id
+            ), rollup AS (
+                INSERT INTO log_stats_minute (minute, service_name, log_type, count)
+                SELECT date_trunc('minute', i.timestamp), COALESCE(s.name, ''), l.name, COUNT(*)
+                FROM inserted i
+                JOIN log_levels l ON l.id = i.level_id
+                LEFT JOIN log_services s ON s.id = i.service_id
+                GROUP BY 1, 2, 3
+                ORDER BY 1, 2, 3
+                ON CONFLICT (minute, service_name, log_type)
+                DO UPDATE SET count = log_stats_minute.count + EXCLUDED.count
+            )
+            SELECT COUNT(*) AS inserted_count, MIN(id) AS min_id, MAX(id) AS max_id,
+                   MIN(timestamp) AS min_timestamp, MAX(timestamp) AS max_timestamp
+            FROM inserted
+            """
+        )
+        inserted = cursor.fetchone()
+        cursor.execute("TRUNCATE logs_staging")
+
+        # Wakes up live tail listeners once the transaction commits; they fetch the new rows by id range
+        if LOG_TAIL_NOTIFY and inserted['inserted_count']:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                (LOG_TAIL_CHANNEL, json.dumps({
+                    'min_id': inserted['min_id'],
+                    'max_id': inserted['max_id'],
+                    'from': inserted['min_timestamp'].isoformat(),
+                    'to': inserted['max_timestamp'].isoformat()
+                }))
+            )
+        return inserted['inserted_count']
+
+    @staticmethod
+    def partition_days(rows):
+        return {datetime.strptime(day, '%Y-%m-%d').date() for day in {row[0][:10] for row in rows}}
+
+    @staticmethod
+    def write_rows(cursor, rows, batch_size=None):
+        # Writes encoded rows (DictionaryService.encode_rows) inside the caller's transaction, returns how many were new
+        batch_size = batch_size or LOG_BATCH_SIZE
+        cursor.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS logs_staging (
+                timestamp TIMESTAMP NOT NULL,
+                level_id SMALLINT NOT NULL,
+                url_id INTEGER,
+                url_query VARCHAR(500),
+                correlation_id VARCHAR(100),
+                service_id SMALLINT,
+                message TEXT,
+                dedup_key VARCHAR(64) NOT NULL,
+                fields JSONB
+            ) ON COMMIT DROP
+            """
+        )
+
         saved_count = 0
+        for start in range(0, len(rows), batch_size):
+            saved_count += LogService._copy_rows(cursor, rows[start:start + batch_size])
+        return saved_count
+
+    @staticmethod
+    def write_dead_letters(cursor, dead_letters):
+        execute_values(
+            cursor,
+            "INSERT INTO log_dead_letters (raw_payload, message_id, error, content_type, content_encoding) VALUES %s",
+            [(psycopg2.Binary(raw), *rest) for raw, *rest in dead_letters]
+        )
+
+    @staticmethod
+    def _record_parse_counts(cursor, counts):
+        cursor.execute(
+            """
+            INSERT INTO log_parse_stats_minute (minute, parsed, fallback_json, failed)
+            VALUES (date_trunc('minute', NOW()::timestamp), %s, %s, %s)
+            ON CONFLICT (minute) DO UPDATE SET
+                parsed = log_parse_stats_minute.parsed + EXCLUDED.parsed,
+                fallback_json = log_parse_stats_minute.fallback_json + EXCLUDED.fallback_json,
+                failed = log_parse_stats_minute.failed + EXCLUDED.failed
+            """,
+            (counts.get(PARSED, 0), counts.get(FALLBACK_JSON, 0), counts.get(FAILED, 0))
+        )
+
+    @staticmethod
+    def _record_dropped(cursor, dropped_counts):
+        # Lines dropped by sampling or rate limiting still show up in the rollup, next to the stored count
+        execute_values(
+            cursor,
+            """
+            INSERT INTO log_stats_minute (minute, service_name, log_type, count, dropped)
+            VALUES %s
+            ON CONFLICT (minute, service_name, log_type)
+            DO UPDATE SET dropped = log_stats_minute.dropped + EXCLUDED.dropped
+            """,
+            [(minute, service_name, log_type, count) for (minute, service_name, log_type), count in sorted(dropped_counts.items())],
+            template="(%s::timestamp, %s, %s, 0, %s)"
+        )
+
+    @staticmethod
+    def save_parsed_batch(batch, batch_size=None):
+        logs, dropped = batch.logs, batch.dropped.copy()
+        spent = ingest_policy.apply(batch)
         try:
-            for log in logs:
-                timestamp = log.get('timestamp')
-                if isinstance(timestamp, str):
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    except:
-                        timestamp = datetime.now()
-                elif timestamp is None:
-                    timestamp = datetime.now()
-                
-                cursor.execute(
-                    """
-                    INSERT INTO logs (timestamp, log_type, url, correlation_id, service_name, message)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        timestamp,
-                        log.get('log_type'),
-                        log.get('url'),
-                        log.get('correlation_id'),
-                        log.get('service_name'),
-                        log.get('message')
-                    )
-                )
-                saved_count += 1
+            return LogService.save_logs(
+                batch.logs, batch_size,
+                dead_letters=batch.dead_letters, parse_counts=batch.counts, dropped_counts=batch.dropped
+            )
+        except Exception:
+            # Rate-limit tokens only count once the batch commits; the batch is left as it was for a retry
+            ingest_policy.refund(spent)
+            batch.logs, batch.dropped = logs, dropped
+            raise
+
+    @staticmethod
+    def save_logs(logs, batch_size=None, dead_letters=None, parse_counts=None, dropped_counts=None):
+        # Partitions and new dictionary keys are created before the ingest connection is checked out,
+        # so one save never holds two pooled connections
+        rows = DictionaryService.encode_rows(LogService.normalize_batch(logs))
+        PartitionService.ensure_partitions(LogService.partition_days(rows))
+        
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+        
+            try:
+                saved_count = LogService.write_rows(cursor, rows, batch_size) if rows else 0
+                # Dead letters and parse counters commit together with the logs, before the batch is acked
+                if dead_letters:
+                    LogService.write_dead_letters(cursor, dead_letters)
+                if parse_counts:
+                    LogService._record_parse_counts(cursor, parse_counts)
+                if dropped_counts:
+                    LogService._record_dropped(cursor, dropped_counts)
             
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            cursor.close()
-            conn.close()
+                conn.commit()
+            except psycopg2.errors.CheckViolation as e:
+                # No partition for a row: another process dropped it, so re-check partitions on the retry
+                conn.rollback()
+                PartitionService.forget_partitions()
+                raise e
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
         
-        return saved_count
+            return saved_count
+
+    @staticmethod
+    def _escape_like(value):
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def _build_filters(filters):
+        conditions = []
+        params = []
+
+        # Bare column comparisons only, so the composite indexes and partition pruning can be used
+        if filters.get('from'):
+            conditions.append('timestamp >= %s')
+            params.append(filters['from'])
+        if filters.get('to'):
+            conditions.append('timestamp < %s')
+            params.append(filters['to'])
+        # Names are turned into their integer keys once (InitPlan), the index scans compare integers
+        if filters.get('service_name'):
+            conditions.append('service_id = (SELECT id FROM log_services WHERE name = %s)')
+            params.append(filters['service_name'])
+        if filters.get('log_type'):
+            conditions.append('level_id = (SELECT id FROM log_levels WHERE name = %s)')
+            params.append(filters['log_type'])
+        if filters.get('correlation_id'):
+            conditions.append('correlation_id = %s')
+            params.append(filters['correlation_id'])
+        if filters.get('url_prefix'):
+            path, query = DictionaryService.split_url(filters['url_prefix'])
+            if query is None:
+                conditions.append('url_id IN (SELECT id FROM log_urls WHERE path LIKE %s)')
+                params.append(LogService._escape_like(path) + '%')
+            else:
+                conditions.append('url_id = (SELECT id FROM log_urls WHERE path = %s) AND url_query LIKE %s')
+                params.extend([path, LogService._escape_like(query) + '%'])
+        # Word search uses the tsvector GIN index, substring search the pg_trgm GIN index
+        if filters.get('q'):
+            conditions.append("message_tsv @@ websearch_to_tsquery('simple', %s)")
+            params.append(filters['q'])
+        if filters.get('contains'):
+            conditions.append('message ILIKE %s')
+            params.append('%' + LogService._escape_like(filters['contains']) + '%')
+
+        return conditions, params
 
     @staticmethod
-    def get_logs_by_date_range(date_from, date_to):
-        conn = get_db_connection()
-        cursor = get_db_cursor(conn)
+    def build_query(filters, limit, after=None):
+        conditions, params = LogService._build_filters(filters)
+
+        # Keyset pagination: continue strictly after the last (timestamp, id) of the previous page
+        if after:
+            conditions.append('(timestamp, id) < (%s, %s)')
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        sql = f"""
+            SELECT {LOG_SELECT_COLUMNS}
+            FROM logs_view
+            {where}
+            ORDER BY timestamp DESC, id DESC
+        """
+        # No limit only for streaming (stream_logs), pages always have one
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(min(limit, LOG_QUERY_MAX_LIMIT))
+        return sql, params
+
+    @staticmethod
+    def _sort_key(log):
+        return log['timestamp'], log['id']
+
+    @staticmethod
+    def query_logs(filters, limit, after=None):
+        sql, params = LogService.build_query(filters, limit, after)
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
         
-        try:
-            cursor.execute(
-                """
-                SELECT * FROM logs
-                WHERE DATE(timestamp) >= %s AND DATE(timestamp) <= %s
-                ORDER BY timestamp DESC
-                """,
-                (date_from, date_to)
-            )
-            logs = cursor.fetchall()
+            try:
+                cursor.execute(sql, params)
+                logs = cursor.fetchall()
+            finally:
+                cursor.close()
+
+        archived_days = ArchiveService.archived_days(filters)
+        if not archived_days:
             return logs
-        finally:
-            cursor.close()
-            conn.close()
+
+        limit = min(limit, LOG_QUERY_MAX_LIMIT)
+        # A full page of rows newer than anything archived can't be changed by the archive
+        if len(logs) >= limit and logs[-1]['timestamp'] > archived_days[0][2]:
+            return logs
+
+        archived = itertools.islice(ArchiveService.iter_logs(filters, after, archived_days), limit)
+        return list(itertools.islice(heapq.merge(logs, archived, key=LogService._sort_key, reverse=True), limit))
+
+    @staticmethod
+    def search_by_relevance(filters, limit):
+        conditions, params = LogService._build_filters(filters)
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+        
+            try:
+                cursor.execute(
+                    f"""
+                    SELECT {LOG_SELECT_COLUMNS},
+                           ts_rank(message_tsv, websearch_to_tsquery('simple', %s)) AS rank
+                    FROM logs_view
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY rank DESC, timestamp DESC, id DESC
+                    LIMIT %s
+                    """,
+                    [filters['q']] + params + [min(limit, LOG_QUERY_MAX_LIMIT)]
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def stream_logs(filters, after=None):
+        archived_days = ArchiveService.archived_days(filters)
+        hot = LogService._stream_hot(filters, after)
+        if not archived_days:
+            return hot
+        return heapq.merge(hot, ArchiveService.iter_logs(filters, after, archived_days), key=LogService._sort_key, reverse=True)
+
+    @staticmethod
+    def _stream_hot(filters, after):
+        sql, params = LogService.build_query(filters, None, after)
+
+        with db_connection() as conn:
+            # Named (server-side) cursor: rows are fetched LOG_STREAM_ITERSIZE at a time instead of all at once
+            cursor = conn.cursor(name=f'logs_stream_{uuid.uuid4().hex}', cursor_factory=RealDictCursor)
+            cursor.itersize = LOG_STREAM_ITERSIZE
+        
+            try:
+                cursor.execute(sql, params)
+                for row in cursor:
+                    yield row
+            finally:
+                cursor.close()
+                conn.rollback()
 
     @staticmethod
     def delete_all_logs():
-        conn = get_db_connection()
-        cursor = get_db_cursor(conn)
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
         
-        try:
-            cursor.execute("DELETE FROM logs")
-            deleted_count = cursor.rowcount
-            conn.commit()
-            return deleted_count
-        finally:
-            cursor.close()
-            conn.close()
\ No newline at end of file
+            try:
+                cursor.execute("TRUNCATE logs, log_stats_minute, log_parse_stats_minute")
+                conn.commit()
+            finally:
+                cursor.close()
+
+        ArchiveService.delete_all()
+
+    @staticmethod
+    def delete_logs_older_than(days):
+        cutoff, dropped_partitions = PartitionService.drop_partitions_older_than(days)
+        deleted_archives = ArchiveService.delete_older_than(cutoff)
+        return cutoff, dropped_partitions, deleted_archives
+
+    @staticmethod
+    def archive_logs_older_than(days=None):
+        return ArchiveService.export_older_than(days)
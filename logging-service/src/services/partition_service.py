@@ -0,0 +1,104 @@
+from db.db import db_connection, get_db_cursor
+from datetime import date, datetime, timedelta
+import os
+import threading
+
+LOG_PARTITION_DAYS_AHEAD = int(os.getenv('LOG_PARTITION_DAYS_AHEAD', 7))
+
+PARTITION_PREFIX = 'logs_'
+
+class PartitionService:
+    # Days whose partition is known to exist, so the ingest path only asks Postgres about new days
+    _known_days = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def partition_name(day):
+        return f"{PARTITION_PREFIX}{day.strftime('%Y%m%d')}"
+
+    @staticmethod
+    def partition_day(name):
+        try:
+            return datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d').date()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def forget_partitions():
+        with PartitionService._lock:
+            PartitionService._known_days.clear()
+
+    @staticmethod
+    def ensure_partitions(days):
+        with PartitionService._lock:
+            missing = sorted(set(days) - PartitionService._known_days)
+        if not missing:
+            return 0
+
+        # Runs in its own short transaction so the ingest transaction never holds DDL locks on logs
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                for day in missing:
+                    cursor.execute("SELECT ensure_log_partition(%s)", (day,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+        with PartitionService._lock:
+            PartitionService._known_days.update(missing)
+        return len(missing)
+
+    @staticmethod
+    def create_future_partitions(days_ahead=None):
+        days_ahead = LOG_PARTITION_DAYS_AHEAD if days_ahead is None else days_ahead
+        today = date.today()
+        return PartitionService.ensure_partitions(today + timedelta(days=offset) for offset in range(-1, days_ahead + 1))
+
+    @staticmethod
+    def list_partitions():
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    """
+                    SELECT c.relname AS name
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'logs'::regclass
+                    ORDER BY c.relname
+                    """
+                )
+                partitions = []
+                for row in cursor.fetchall():
+                    day = PartitionService.partition_day(row['name'])
+                    if day is not None:
+                        partitions.append((row['name'], day))
+                return partitions
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def drop_partitions_older_than(days):
+        cutoff = date.today() - timedelta(days=days)
+        expired = [name for name, day in PartitionService.list_partitions() if day + timedelta(days=1) <= cutoff]
+        PartitionService.detach_partitions(expired, drop=True)
+        return cutoff, expired
+
+    @staticmethod
+    def detach_partitions(names, drop=False):
+        # DETACH ... CONCURRENTLY can't run inside a transaction block
+        with db_connection() as conn:
+            conn.autocommit = True
+            cursor = get_db_cursor(conn)
+            try:
+                for name in names:
+                    cursor.execute(f'ALTER TABLE logs DETACH PARTITION "{name}" CONCURRENTLY')
+                    if drop:
+                        cursor.execute(f'DROP TABLE "{name}"')
+            finally:
+                cursor.close()
+                PartitionService.forget_partitions()
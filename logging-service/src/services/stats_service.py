@@ -0,0 +1,35 @@
+from db.db import db_connection, get_db_cursor
+
+STATS_BUCKETS = ('minute', 'hour', 'day')
+
+class StatsService:
+    @staticmethod
+    def get_stats(date_from, date_to, bucket='minute', service_name=None, log_type=None):
+        conditions = ['minute >= %s', 'minute < %s']
+        params = [date_from, date_to]
+        if service_name:
+            conditions.append('service_name = %s')
+            params.append(service_name)
+        if log_type:
+            conditions.append('log_type = %s')
+            params.append(log_type)
+
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+        
+            try:
+                # Reads only the rollup table, so cost depends on the window size, not on raw log volume
+                cursor.execute(
+                    f"""
+                    SELECT date_trunc(%s, minute) AS bucket, service_name, log_type, SUM(count)::BIGINT AS count,
+                           SUM(dropped)::BIGINT AS dropped
+                    FROM log_stats_minute
+                    WHERE {' AND '.join(conditions)}
+                    GROUP BY 1, 2, 3
+                    ORDER BY 1, 2, 3
+                    """,
+                    [bucket] + params
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
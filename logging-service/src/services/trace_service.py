@@ -0,0 +1,82 @@
+from db.db import db_connection, get_db_cursor
+from utils.lru_cache import LRUCache
+import os
+
+TRACE_MAX_EVENTS = int(os.getenv('TRACE_MAX_EVENTS', 1000))
+
+# Traces that are still receiving logs only need a short TTL to pick up new hops
+trace_cache = LRUCache(
+    max_size=int(os.getenv('TRACE_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('TRACE_CACHE_TTL', 30))
+)
+
+class TraceService:
+    @staticmethod
+    def _fetch_events(correlation_id):
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+        
+            try:
+                # Served by idx_logs_correlation_id on every partition
+                cursor.execute(
+                    """
+                    SELECT id, timestamp, log_type, url, service_name, message, fields
+                    FROM logs_view
+                    WHERE correlation_id = %s
+                    ORDER BY timestamp, id
+                    LIMIT %s
+                    """,
+                    (correlation_id, TRACE_MAX_EVENTS)
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _build_timeline(correlation_id, events):
+        start = events[0]['timestamp']
+        end = events[-1]['timestamp']
+
+        hops = []
+        previous = None
+        for event in events:
+            hops.append({
+                'id': event['id'],
+                'timestamp': event['timestamp'].isoformat(),
+                'service_name': event['service_name'],
+                'log_type': event['log_type'],
+                'url': event['url'],
+                'message': event['message'],
+                'fields': event['fields'],
+                'offset_ms': round((event['timestamp'] - start).total_seconds() * 1000, 3),
+                'latency_ms': round((event['timestamp'] - previous['timestamp']).total_seconds() * 1000, 3) if previous else 0,
+                'service_changed': previous is not None and previous['service_name'] != event['service_name']
+            })
+            previous = event
+
+        services = list(dict.fromkeys(event['service_name'] for event in events))
+
+        return {
+            'correlation_id': correlation_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'duration_ms': round((end - start).total_seconds() * 1000, 3),
+            'services': services,
+            'count': len(hops),
+            'truncated': len(hops) >= TRACE_MAX_EVENTS,
+            'hops': hops
+        }
+
+    @staticmethod
+    def get_trace(correlation_id):
+        trace = trace_cache.get(correlation_id)
+        if trace is not None:
+            return trace
+
+        events = TraceService._fetch_events(correlation_id)
+        if not events:
+            return None
+
+        trace = TraceService._build_timeline(correlation_id, events)
+        trace_cache.set(correlation_id, trace)
+        return trace
@@ -0,0 +1,93 @@
+import os
+import signal
+import time
+import traceback
+
+CONSUMER_SHUTDOWN_TIMEOUT = float(os.getenv('CONSUMER_SHUTDOWN_TIMEOUT', 30))
+CONSUMER_RESTART_DELAY = float(os.getenv('CONSUMER_RESTART_DELAY', 1))
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+class ConsumerSupervisor:
+    """Forks `workers` processes running target(index) and keeps them running until SIGTERM/SIGINT.
+
+    On shutdown every worker gets SIGTERM so it can flush its in-flight batch; workers still alive
+    after CONSUMER_SHUTDOWN_TIMEOUT are killed (their unacked messages are redelivered by the broker).
+    """
+
+    def __init__(self, workers, target, shutdown_timeout=None, restart_delay=None):
+        self.workers = workers
+        self.target = target
+        self.shutdown_timeout = CONSUMER_SHUTDOWN_TIMEOUT if shutdown_timeout is None else shutdown_timeout
+        self.restart_delay = CONSUMER_RESTART_DELAY if restart_delay is None else restart_delay
+        self.children = {}
+        self._stopping = False
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return pid
+
+        # Worker: drop the supervisor's handlers, target installs its own
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        code = 0
+        try:
+            self.target(index)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _handle_stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        print(f"Stopping {len(self.children)} consumer worker(s)...")
+        self._signal_children(signal.SIGTERM)
+        signal.alarm(max(1, int(self.shutdown_timeout)))
+
+    def _handle_timeout(self, signum, frame):
+        print(f"Consumer workers still running after {self.shutdown_timeout}s, killing them")
+        self._signal_children(signal.SIGKILL)
+
+    def stop(self):
+        self._handle_stop(signal.SIGTERM, None)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGALRM, self._handle_timeout)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        print(f"Consumer supervisor {os.getpid()} started {self.workers} worker(s)")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = self.children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+
+            print(f"Consumer worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            time.sleep(self.restart_delay)
+            if not self._stopping:
+                self._spawn(index)
+
+        signal.alarm(0)
+        print("Consumer supervisor stopped")
@@ -0,0 +1,186 @@
+from db.db import db_connection, get_db_cursor
+from psycopg2.extras import execute_values
+import json
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Example:
+# {"keep_levels": ["WARN", "ERROR"],
+#  "default": {"sample": {"INFO": 100}, "rate_limit": 0},
+#  "services": {"notification-service": {"sample": {"INFO": 10}, "rate_limit": 200, "burst": 400}}}
+# sample is the percentage of lines kept per level, rate_limit is lines/s per service for the whole deployment
+# (0 = off): the token buckets live in log_rate_buckets, so every consumer and gunicorn process draws from the same one
+LOG_INGEST_POLICY = os.getenv('LOG_INGEST_POLICY', '{}')
+
+MINUTE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+
+class IngestPolicy:
+    """Per-service, per-level sampling and rate limiting applied to parsed batches before they are saved."""
+
+    def __init__(self, config):
+        self.keep_levels = {level.upper() for level in config.get('keep_levels', ('WARN', 'WARNING', 'ERROR'))}
+        self.default = config.get('default', {})
+        self.services = config.get('services', {})
+
+    @classmethod
+    def from_env(cls):
+        return cls(json.loads(LOG_INGEST_POLICY))
+
+    @property
+    def enabled(self):
+        return bool(self.default or self.services)
+
+    def _setting(self, service_name, key, default):
+        return self.services.get(service_name, {}).get(key, self.default.get(key, default))
+
+    def _sample_percent(self, service_name, level):
+        rates = {**self.default.get('sample', {}), **self.services.get(service_name, {}).get('sample', {})}
+        return float(rates.get(level, 100))
+
+    def _sampled(self, log, percent):
+        if percent >= 100:
+            return True
+        if percent <= 0:
+            return False
+        # Decided by correlation id when there is one, so a request's lines are kept or dropped together;
+        # otherwise by message id or content, so a redelivered batch gets the same decisions
+        key = log.get('correlation_id') or log.get('message_id') or f"{log.get('timestamp')}\x1f{log.get('message')}"
+        return zlib.crc32(str(key).encode('utf-8')) % 10000 < percent * 100
+
+    def _rate(self, service_name):
+        """(rate, burst) of the service's bucket, None when it isn't rate limited."""
+        rate = float(self._setting(service_name, 'rate_limit', 0))
+        if rate <= 0:
+            return None
+        return rate, float(self._setting(service_name, 'burst', rate))
+
+    def _take(self, wanted):
+        """Takes up to wanted[service_name] tokens from each service's bucket in one transaction; returns the tokens granted."""
+        rows = [(service_name, count, *self._rate(service_name)) for service_name, count in sorted(wanted.items())]
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                # A new bucket starts full
+                execute_values(
+                    cursor,
+                    "INSERT INTO log_rate_buckets (service_name, tokens) VALUES %s ON CONFLICT (service_name) DO NOTHING",
+                    [(service_name, burst) for service_name, _, _, burst in rows]
+                )
+                # Refilled for the time since the last take and drawn down under a row lock, so concurrent
+                # processes never hand out the same tokens
+                granted = execute_values(
+                    cursor,
+                    """
+                    WITH wanted (service_name, wanted, rate, burst) AS (VALUES %s),
+                    refilled AS (
+                        SELECT b.service_name, w.wanted,
+                               LEAST(w.burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated) * w.rate) AS tokens
+                        FROM log_rate_buckets b
+                        JOIN wanted w ON w.service_name = b.service_name
+                        ORDER BY b.service_name
+                        FOR UPDATE OF b
+                    )
+                    UPDATE log_rate_buckets b
+                    SET tokens = r.tokens - LEAST(FLOOR(r.tokens), r.wanted), updated = now()
+                    FROM refilled r
+                    WHERE b.service_name = r.service_name
+                    RETURNING b.service_name, LEAST(FLOOR(r.tokens), r.wanted)::int AS granted
+                    """,
+                    rows,
+                    template="(%s, %s::int, %s::double precision, %s::double precision)",
+                    fetch=True
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+        return Counter({row['service_name']: row['granted'] for row in granted})
+
+    @staticmethod
+    def _minute(log):
+        timestamp = log.get('timestamp')
+        if isinstance(timestamp, str) and MINUTE_PATTERN.match(timestamp):
+            return timestamp[:10] + 'T' + timestamp[11:16]
+        return datetime.now().strftime('%Y-%m-%dT%H:%M')
+
+    def apply(self, batch):
+        """Removes dropped lines from batch.logs and counts them per (minute, service_name, log_type) in batch.dropped.
+
+        Returns the tokens taken per service, for refund() if the batch then fails to save.
+        """
+        spent = Counter()
+        if not self.enabled or not batch.logs:
+            return spent
+
+        dropped = Counter()
+        decisions = []
+        # Lines that passed sampling and still need a rate-limit token, per service
+        limited = defaultdict(int)
+        for log in batch.logs:
+            level = str(log.get('log_type') or '').upper()
+            service_name = log.get('service_name') or ''
+            # WARN/ERROR are never sampled or rate limited
+            if level in self.keep_levels:
+                decisions.append(True)
+            elif not self._sampled(log, self._sample_percent(service_name, level)):
+                decisions.append(False)
+            elif self._rate(service_name) is None:
+                decisions.append(True)
+            else:
+                decisions.append(None)
+                limited[service_name] += 1
+
+        # One round trip per batch; the first lines of each service get its tokens, the rest are dropped
+        granted = self._take(limited) if limited else Counter()
+        kept = []
+        for log, keep in zip(batch.logs, decisions):
+            if keep is None:
+                service_name = log.get('service_name') or ''
+                keep = spent[service_name] < granted[service_name]
+                if keep:
+                    spent[service_name] += 1
+            if keep:
+                kept.append(log)
+            else:
+                dropped[(self._minute(log), log.get('service_name') or '', log.get('log_type'))] += 1
+
+        batch.logs = kept
+        batch.dropped.update(dropped)
+        return spent
+
+    def refund(self, spent):
+        # A batch that didn't commit is redelivered and goes through apply() again; it shouldn't pay twice
+        spent = {service_name: tokens for service_name, tokens in spent.items() if tokens}
+        if not spent:
+            return
+        try:
+            with db_connection() as conn:
+                cursor = get_db_cursor(conn)
+                try:
+                    execute_values(
+                        cursor,
+                        """
+                        UPDATE log_rate_buckets b
+                        SET tokens = LEAST(r.burst, b.tokens + r.tokens)
+                        FROM (VALUES %s) AS r (service_name, tokens, burst)
+                        WHERE b.service_name = r.service_name
+                        """,
+                        [(service_name, tokens, self._rate(service_name)[1]) for service_name, tokens in sorted(spent.items())],
+                        template="(%s, %s::double precision, %s::double precision)"
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    raise e
+                finally:
+                    cursor.close()
+        except Exception as e:
+            # The save already failed and is what the caller reports; unreturned tokens refill over time
+            print(f"Failed to refund rate limit tokens: {e}")
+
+ingest_policy = IngestPolicy.from_env()
@@ -0,0 +1,60 @@
+import zlib
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def _read_chunks(stream):
+    while True:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+def _inflate(chunks):
+    """Decompress a gzip body chunk by chunk; raises zlib.error if it is cut off mid-stream."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    started = False
+    for chunk in chunks:
+        while chunk:
+            started = True
+            # Bounded output per step, so a highly compressed body can't be inflated into memory at once
+            yield decompressor.decompress(chunk, STREAM_CHUNK_SIZE)
+            if decompressor.eof:
+                # Concatenated members (e.g. appended gzip files) are one stream, like gzip -d reads them
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                started = False
+            else:
+                chunk = decompressor.unconsumed_tail
+    if started:
+        raise zlib.error('Compressed body ends before the end of the gzip stream')
+
+def iter_lines(stream, gzip=False, max_line_length=1024 * 1024):
+    """Yield (line, too_long) from a file-like body, decompressing gzip incrementally."""
+    pending = b''
+    skipping = False
+
+    def split(data):
+        nonlocal pending, skipping
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_length:
+                yield line[:200], True
+                continue
+            yield line.rstrip(b'\r'), False
+        # Never buffer more than one line; an overlong line is reported once and the rest of it dropped
+        if len(pending) > max_line_length:
+            if not skipping:
+                yield pending[:200], True
+            pending = b''
+            skipping = True
+
+    chunks = _read_chunks(stream)
+    for data in (_inflate(chunks) if gzip else chunks):
+        yield from split(data)
+
+    if pending and not skipping:
+        yield pending.rstrip(b'\r'), False
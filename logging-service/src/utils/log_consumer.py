@@ -0,0 +1,111 @@
+import os
+import time
+import threading
+import pika
+from services.log_service import LogService
+from utils.rabbitmq_setup import get_rabbitmq_connection
+from utils.log_parser import parse_batch
+from utils.log_envelope import unpack_message
+from utils.poison_batch import PoisonTracker, save_isolating
+
+class LogConsumer:
+    def __init__(self, prefetch=None, batch_size=None, flush_interval=None, connection_factory=None, save_batch=None):
+        self.prefetch = prefetch or int(os.getenv('CONSUMER_PREFETCH', 1000))
+        self.batch_size = batch_size or int(os.getenv('CONSUMER_BATCH_SIZE', 500))
+        self.flush_interval = flush_interval or float(os.getenv('CONSUMER_FLUSH_INTERVAL', 1.0))
+        self.retry_delay = float(os.getenv('CONSUMER_RETRY_DELAY', 5))
+
+        # The broker only hands out `prefetch` unacked messages, so a batch can never grow past it
+        self.batch_size = min(self.batch_size, self.prefetch)
+
+        # Injectable so the consumer can be driven by a broker stand-in (scripts/benchmark_consumers.py)
+        self.connection_factory = connection_factory or get_rabbitmq_connection
+        self.save_batch = save_batch or LogService.save_parsed_batch
+        self.poison = PoisonTracker()
+
+        self.connection = None
+        self.channel = None
+        self.consumer_tag = None
+        self.messages = []
+        self.last_delivery_tag = None
+        self.last_flush = time.monotonic()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _on_message(self, channel, method, properties, body):
+        # Raw bodies are parsed per batch at flush time, which lets large batches use the parser's process pool;
+        # batched envelopes are only unpacked here, so batch_size counts records, not deliveries
+        self.messages.extend(unpack_message(body, properties))
+        self.last_delivery_tag = method.delivery_tag
+
+        if len(self.messages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.messages:
+            return 0
+
+        messages, delivery_tag = self.messages, self.last_delivery_tag
+        self.messages, self.last_delivery_tag = [], None
+
+        try:
+            saved_count = save_isolating(parse_batch(messages), self.save_batch, self.poison)
+        except Exception as e:
+            print(f"Failed to save batch of {len(messages)} messages, requeueing: {e}")
+            self.channel.basic_nack(delivery_tag=delivery_tag, multiple=True, requeue=True)
+            time.sleep(self.retry_delay)
+            return 0
+
+        self.channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+        return saved_count
+
+    def _reset(self):
+        # Unacked deliveries are redelivered by the broker once the channel is gone
+        self.messages, self.last_delivery_tag = [], None
+        self.last_flush = time.monotonic()
+
+    def _time_until_flush(self):
+        return max(0, self.flush_interval - (time.monotonic() - self.last_flush))
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.connection = self.connection_factory()
+                self.channel = self.connection.channel()
+                self.channel.queue_declare(queue='logging_queue', durable=True)
+                self.channel.basic_qos(prefetch_count=self.prefetch)
+                self.consumer_tag = self.channel.basic_consume(queue='logging_queue', on_message_callback=self._on_message)
+                self._reset()
+
+                print(f"Log consumer started (prefetch={self.prefetch}, batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+                while not self._stopping.is_set():
+                    self.connection.process_data_events(time_limit=self._time_until_flush())
+                    if self._time_until_flush() == 0:
+                        self.flush()
+
+                # Graceful shutdown: stop deliveries first (prefetched but undispatched messages are nacked
+                # back to the queue for the other consumers), then save and ack the in-flight batch
+                self.channel.basic_cancel(self.consumer_tag)
+                self.flush()
+            except pika.exceptions.AMQPError as e:
+                print(f"Log consumer lost RabbitMQ connection: {e}")
+                self._reset()
+                time.sleep(self.retry_delay)
+            finally:
+                try:
+                    if self.connection and self.connection.is_open:
+                        self.connection.close()
+                except Exception as e:
+                    print(f"Error closing RabbitMQ connection: {e}")
+
+        print("Log consumer stopped")
+
+def start_background_consumer():
+    consumer = LogConsumer()
+    thread = threading.Thread(target=consumer.run, name='log-consumer', daemon=True)
+    thread.start()
+    return consumer
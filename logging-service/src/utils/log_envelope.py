@@ -0,0 +1,84 @@
+import gzip
+import json
+import zlib
+from types import SimpleNamespace
+
+# Batched log envelope: one AMQP message carrying many structured records instead of one formatted line each.
+#   content_type      application/vnd.logs.batch+json
+#   content_encoding  gzip or unset
+#   headers           {'x-log-envelope-version': 1}
+#   body              {"version": 1, "service_name": "...", "records": [{"id", "timestamp", "log_type", "url",
+#                      "correlation_id", "message", optionally "service_name"}, ...]}
+# Any other record keys (e.g. duration_ms, status) are stored in logs.fields.
+# Messages with any other content type are legacy single lines (or single JSON objects).
+ENVELOPE_CONTENT_TYPE = 'application/vnd.logs.batch+json'
+ENVELOPE_VERSION_HEADER = 'x-log-envelope-version'
+ENVELOPE_VERSIONS = (1,)
+
+class RejectedMessage:
+    """Stands in for a message that can't be unpacked, so it still ends up in log_dead_letters.
+
+    content_type and content_encoding are kept with the dead letter, so a re-ingest can unpack the raw body again.
+    """
+
+    def __init__(self, raw, error, content_type=None, content_encoding=None):
+        self.raw = raw
+        self.error = error
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+
+def is_envelope(properties):
+    return properties is not None and getattr(properties, 'content_type', None) == ENVELOPE_CONTENT_TYPE
+
+def _decode(body, content_encoding):
+    if content_encoding in (None, '', 'identity'):
+        return body
+    if content_encoding == 'gzip':
+        return gzip.decompress(body)
+    raise ValueError(f"Unsupported content encoding '{content_encoding}'")
+
+def unpack_envelope(body, properties):
+    """Returns [(record, message_id)] for the records in an envelope; raises ValueError if it is malformed."""
+    try:
+        envelope = json.loads(_decode(body, getattr(properties, 'content_encoding', None)))
+    except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Envelope body can't be decoded: {e}")
+
+    if not isinstance(envelope, dict) or not isinstance(envelope.get('records'), list):
+        raise ValueError('Envelope has no records list')
+    version = envelope.get('version')
+    if version not in ENVELOPE_VERSIONS:
+        raise ValueError(f"Unsupported envelope version {version!r}")
+
+    service_name = envelope.get('service_name')
+    envelope_id = getattr(properties, 'message_id', None)
+    messages = []
+    for index, record in enumerate(envelope['records']):
+        if not isinstance(record, dict):
+            messages.append((RejectedMessage(json.dumps(record).encode('utf-8'), 'Envelope record is not an object'), None))
+            continue
+        if service_name and not record.get('service_name'):
+            record['service_name'] = service_name
+        # Records carry their own producer id; without one the envelope id plus position is just as stable on redelivery
+        message_id = record.pop('id', None) or (f"{envelope_id}:{index}" if envelope_id else None)
+        messages.append((record, message_id))
+    return messages
+
+def unpack_message(body, properties):
+    """Expands one delivery into the (body, message_id) pairs parse_batch takes."""
+    message_id = getattr(properties, 'message_id', None)
+    if not is_envelope(properties):
+        return [(body, message_id)]
+    try:
+        return unpack_envelope(body, properties)
+    except ValueError as e:
+        return [(
+            RejectedMessage(bytes(body), str(e), properties.content_type, getattr(properties, 'content_encoding', None)),
+            message_id
+        )]
+
+def unpack_dead_letter(raw, message_id, content_type, content_encoding):
+    """Like unpack_message, for a log_dead_letters row and the message properties stored with it."""
+    return unpack_message(raw, SimpleNamespace(
+        content_type=content_type, content_encoding=content_encoding, message_id=message_id
+    ))
@@ -0,0 +1,201 @@
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from utils.log_envelope import RejectedMessage
+
+# Canonical format: <timestamp> <LogType> <URL> Correlation: <CorrelationId> [<serviceName>] - <Message>
+# Example: 2026-01-01 21:03:03,751 INFO http://localhost:5003/health Correlation: 3411af89 [payment-service] - Klic storitve GET /health
+LOG_LINE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) (\w+) (\S+) Correlation: (\S+) \[([^\]]+)\] - (.+)$', re.DOTALL)
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}')
+LOG_TYPE_PATTERN = re.compile(r'\w+')
+
+LOG_PARSE_PROCESSES = int(os.getenv('LOG_PARSE_PROCESSES', 1))
+# Smaller batches are parsed in-process, shipping them to workers costs more than it saves
+LOG_PARSE_PARALLEL_THRESHOLD = int(os.getenv('LOG_PARSE_PARALLEL_THRESHOLD', 4000))
+
+def _to_iso(timestamp_str):
+    # '2026-01-01 21:03:03,751' -> '2026-01-01T21:03:03.751000'; raises ValueError on impossible dates
+    return datetime.fromisoformat(timestamp_str.replace(',', '.', 1)).isoformat()
+
+def _parse_canonical_fast(line):
+    # Plain string slicing for the canonical format, returns None whenever the line isn't obviously canonical
+    if len(line) < 24 or line[23] != ' ' or not TIMESTAMP_PATTERN.match(line, 0, 23):
+        return None
+
+    parts = line[24:].split(' ', 3)
+    if len(parts) < 4 or parts[2] != 'Correlation:':
+        return None
+    log_type, url, _, rest = parts
+    if not url or not LOG_TYPE_PATTERN.fullmatch(log_type):
+        return None
+
+    correlation_id, separator, rest = rest.partition(' [')
+    if not separator or not correlation_id or ' ' in correlation_id:
+        return None
+
+    service_name, separator, message = rest.partition('] - ')
+    if not separator or not service_name or not message or ']' in service_name:
+        return None
+
+    return line[:23], log_type, url, correlation_id, service_name, message
+
+def parse_line(line):
+    fields = _parse_canonical_fast(line)
+    if fields is None:
+        match = LOG_LINE_PATTERN.match(line)
+        if not match:
+            return None
+        fields = match.groups()
+
+    timestamp_str, log_type, url, correlation_id, service_name, message = fields
+    return {
+        'timestamp': _to_iso(timestamp_str),
+        'log_type': log_type,
+        'url': url,
+        'correlation_id': correlation_id,
+        'service_name': service_name,
+        'message': message
+    }
+
+PARSED = 'parsed'
+FALLBACK_JSON = 'fallback_json'
+FAILED = 'failed'
+
+# Widths of the columns the fields end up in (init.sql); longer values would fail the whole COPY
+FIELD_WIDTHS = {'log_type': 10, 'service_name': 100, 'correlation_id': 100}
+# log_urls.path and logs.url_query, the URL is split at '?'
+URL_PART_WIDTH = 500
+
+class ParsedBatch:
+    def __init__(self):
+        self.logs = []
+        # dead_letter() rows for lines that could not be parsed
+        self.dead_letters = []
+        self.counts = {PARSED: 0, FALLBACK_JSON: 0, FAILED: 0}
+        # (minute, service_name, log_type) -> lines dropped by the ingest policy
+        self.dropped = Counter()
+
+def _validate(log_data, source, require_timestamp):
+    """Checks what save_logs would otherwise reject for the whole batch; returns an error or None.
+
+    A valid timestamp is rewritten to the ISO form partitioning and COPY expect.
+    """
+    log_type = log_data.get('log_type')
+    if not log_type or not isinstance(log_type, str):
+        return f"{source} has no log_type"
+
+    timestamp = log_data.get('timestamp')
+    if timestamp is None:
+        if require_timestamp:
+            return f"{source} has no timestamp"
+    elif not isinstance(timestamp, str):
+        return f"{source} timestamp is not a string"
+    else:
+        try:
+            log_data['timestamp'] = datetime.fromisoformat(timestamp).isoformat()
+        except ValueError:
+            return f"{source} has an invalid timestamp '{timestamp[:50]}'"
+
+    for field in ('log_type', 'service_name', 'correlation_id', 'url', 'message'):
+        value = log_data.get(field)
+        if value is not None and not isinstance(value, str):
+            return f"{source} {field} is not a string"
+    for field, width in FIELD_WIDTHS.items():
+        if len(log_data.get(field) or '') > width:
+            return f"{source} {field} is longer than {width} characters"
+    path, separator, query = (log_data.get('url') or '').partition('?')
+    if len(path) > URL_PART_WIDTH or len(separator + query) > URL_PART_WIDTH:
+        return f"{source} url path or query is longer than {URL_PART_WIDTH} characters"
+    return None
+
+def dead_letter(body, message_id, error):
+    """The (raw_payload, message_id, error, content_type, content_encoding) row LogService writes to log_dead_letters."""
+    if isinstance(body, RejectedMessage):
+        return body.raw, message_id, error, body.content_type, body.content_encoding
+    return bytes(_raw_payload(body)), message_id, error, None, None
+
+def _raw_payload(body):
+    if isinstance(body, RejectedMessage):
+        return body.raw
+    if isinstance(body, dict):
+        return json.dumps(body, ensure_ascii=False).encode('utf-8')
+    return body if isinstance(body, (bytes, bytearray)) else body.encode('utf-8')
+
+def parse_log_message(body, message_id=None):
+    """Returns (log_data, kind, error); kind is PARSED, FALLBACK_JSON or FAILED."""
+    if isinstance(body, RejectedMessage):
+        return None, FAILED, body.error
+    try:
+        if isinstance(body, dict):
+            # Structured record from a batched envelope (utils/log_envelope.py), no line parsing needed
+            log_data, kind = body, PARSED
+            error = _validate(log_data, 'Envelope record', require_timestamp=True)
+        else:
+            log_message = body.decode('utf-8') if isinstance(body, (bytes, bytearray)) else body
+
+            log_data = parse_line(log_message)
+            kind = PARSED
+            if log_data is None:
+                # If format doesn't match, try JSON fallback (for backward compatibility)
+                try:
+                    log_data = json.loads(log_message)
+                except ValueError:
+                    return None, FAILED, 'Line does not match the log format and is not valid JSON'
+                if not isinstance(log_data, dict):
+                    return None, FAILED, 'JSON log message is not an object'
+                kind = FALLBACK_JSON
+                # Without a timestamp the row gets the ingest time (LogService.normalize_batch)
+                error = _validate(log_data, 'JSON log message', require_timestamp=False)
+            else:
+                error = _validate(log_data, 'Log line', require_timestamp=True)
+        # Anything that fails here goes to log_dead_letters instead of failing (and requeueing) the whole batch
+        if error:
+            return None, FAILED, error
+    except Exception as e:
+        return None, FAILED, f"{type(e).__name__}: {e}"
+
+    # Producers stamp a unique message_id, which survives redelivery and is used as the dedup key
+    if message_id:
+        log_data['message_id'] = message_id
+
+    return log_data, kind, None
+
+def _parse_chunk(messages):
+    return [parse_log_message(body, message_id) for body, message_id in messages]
+
+_executor = None
+_executor_pid = None
+
+def _get_executor(processes):
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ProcessPoolExecutor(max_workers=processes)
+        _executor_pid = os.getpid()
+    return _executor
+
+def parse_batch(messages, processes=None):
+    """Parse a list of (body, message_id) pairs, across processes for large batches.
+
+    body is a raw line, or a record / RejectedMessage from utils.log_envelope.unpack_message.
+    """
+    processes = processes or LOG_PARSE_PROCESSES
+
+    if processes <= 1 or len(messages) < LOG_PARSE_PARALLEL_THRESHOLD:
+        results = _parse_chunk(messages)
+    else:
+        chunk_size = -(-len(messages) // (processes * 4))
+        chunks = [messages[start:start + chunk_size] for start in range(0, len(messages), chunk_size)]
+        results = [result for chunk in _get_executor(processes).map(_parse_chunk, chunks) for result in chunk]
+
+    batch = ParsedBatch()
+    for (body, message_id), (log_data, kind, error) in zip(messages, results):
+        batch.counts[kind] += 1
+        if kind == FAILED:
+            batch.dead_letters.append(dead_letter(body, message_id, error))
+        else:
+            batch.logs.append(log_data)
+
+    return batch
@@ -0,0 +1,143 @@
+from db.db import db_connection, get_db_connection, get_db_cursor
+from collections import deque
+from datetime import datetime
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+LOG_TAIL_CHANNEL = 'logs_ingested'
+LOG_TAIL_QUEUE_SIZE = int(os.getenv('LOG_TAIL_QUEUE_SIZE', 1000))
+LOG_TAIL_RECENT_IDS = 50000
+# Every viewer holds a worker thread for as long as it is connected; the cap keeps the rest of the
+# threads (GUNICORN_THREADS per worker) free for the other endpoints. It is counted per process, so it is
+# only a cap on the whole deployment when the tail runs in one process (the logging-tail service in
+# docker-compose); 0 turns the tail off here and LOG_TAIL_URL, if set, is where viewers are sent instead
+LOG_TAIL_MAX_VIEWERS = int(os.getenv('LOG_TAIL_MAX_VIEWERS') or max(1, int(os.getenv('GUNICORN_THREADS', 4)) // 2))
+LOG_TAIL_URL = os.getenv('LOG_TAIL_URL')
+
+class TailSubscription:
+    def __init__(self, filters):
+        self.filters = {key: value for key, value in filters.items() if value}
+        self.queue = queue.Queue(maxsize=LOG_TAIL_QUEUE_SIZE)
+        self.dropped = 0
+
+    def matches(self, log):
+        return all(log.get(key) == value for key, value in self.filters.items())
+
+    def offer(self, log):
+        # A slow viewer loses lines instead of slowing down everyone else
+        try:
+            self.queue.put_nowait(log)
+        except queue.Full:
+            self.dropped += 1
+
+class LogTailBroadcaster:
+    """One LISTEN connection and one range query per ingested batch per process, shared by all viewers."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Concurrent batches can have overlapping id ranges, so recently delivered ids are remembered
+        self._recent_ids = deque(maxlen=LOG_TAIL_RECENT_IDS)
+        self._recent_set = set()
+        self._viewer_slots = threading.BoundedSemaphore(LOG_TAIL_MAX_VIEWERS)
+
+    def reserve_viewer(self):
+        """Takes one of the LOG_TAIL_MAX_VIEWERS slots of this process, False if they are all in use."""
+        return self._viewer_slots.acquire(blocking=False)
+
+    def release_viewer(self):
+        self._viewer_slots.release()
+
+    def subscribe(self, filters):
+        subscription = TailSubscription(filters)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='log-tail-listener', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def _fetch(self, notification):
+        with db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute(
+                    """
+                    SELECT id, timestamp, log_type, url, correlation_id, service_name, message, fields
+                    FROM logs_view
+                    WHERE id BETWEEN %s AND %s AND timestamp BETWEEN %s AND %s
+                    ORDER BY timestamp, id
+                    """,
+                    (
+                        notification['min_id'],
+                        notification['max_id'],
+                        datetime.fromisoformat(notification['from']),
+                        datetime.fromisoformat(notification['to'])
+                    )
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def _publish(self, logs):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for log in logs:
+            if log['id'] in self._recent_set:
+                continue
+            if len(self._recent_ids) == self._recent_ids.maxlen:
+                self._recent_set.discard(self._recent_ids[0])
+            self._recent_ids.append(log['id'])
+            self._recent_set.add(log['id'])
+
+            log = dict(log)
+            log['timestamp'] = log['timestamp'].isoformat()
+            for subscription in subscribers:
+                if subscription.matches(log):
+                    subscription.offer(log)
+
+    def _listen(self):
+        while True:
+            # Decided under the lock so a viewer subscribing right now either sees this thread or starts a new one
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+            conn = None
+            try:
+                # Dedicated connection outside the pool, it sits in LISTEN for as long as anyone is watching
+                conn = get_db_connection()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {LOG_TAIL_CHANNEL}")
+
+                while self._has_subscribers():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notification = json.loads(conn.notifies.pop(0).payload)
+                        self._publish(self._fetch(notification))
+            except Exception as e:
+                print(f"Log tail listener error: {e}")
+                time.sleep(1)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+log_tail = LogTailBroadcaster()
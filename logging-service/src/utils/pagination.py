@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime, timezone
+
+def parse_timestamp(value):
+    """Query parameter to the naive UTC time logs are compared against; an offset, if given, is applied."""
+    timestamp = datetime.fromisoformat(value)
+    # The archive can't compare aware values with its naive column, Postgres converts them the same way (UTC)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def encode_cursor(timestamp, log_id):
+    raw = f"{timestamp.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
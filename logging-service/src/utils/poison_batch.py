@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import psycopg2
+from psycopg2.pool import PoolError
+from utils.log_parser import ParsedBatch, FAILED, dead_letter
+from utils.lru_cache import LRUCache
+
+# A log that fails to save on its own this many times is dead-lettered instead of requeued again
+POISON_MAX_ATTEMPTS = int(os.getenv('CONSUMER_POISON_ATTEMPTS', 3))
+POISON_TRACKED_LOGS = int(os.getenv('CONSUMER_POISON_TRACKED_LOGS', 10000))
+
+# The database being unreachable says nothing about the rows, those batches are only requeued
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError)
+
+class PoisonTracker:
+    """Counts, per log and per process, how often it failed to save on its own across redeliveries."""
+
+    def __init__(self, max_attempts=None, size=None):
+        self.max_attempts = max_attempts or POISON_MAX_ATTEMPTS
+        self._attempts = LRUCache(max_size=size or POISON_TRACKED_LOGS, ttl=3600)
+
+    @staticmethod
+    def key(log):
+        return log.get('message_id') or hashlib.sha1(json.dumps(log, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def failed(self, log):
+        """Records a failed attempt; returns True once the log should be dead-lettered."""
+        key = self.key(log)
+        attempts = (self._attempts.get(key) or 0) + 1
+        self._attempts.set(key, attempts)
+        return attempts >= self.max_attempts
+
+    def forget(self, log):
+        self._attempts.set(self.key(log), 0)
+
+def _logs_only(logs):
+    batch = ParsedBatch()
+    batch.logs = logs
+    # Parse counters and dead letters are written once, with the final save in save_isolating
+    batch.counts = {}
+    return batch
+
+def _bisect(logs, save_batch, failures):
+    try:
+        return save_batch(_logs_only(logs))
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception as e:
+        if len(logs) == 1:
+            failures.append((logs[0], e))
+            return 0
+    middle = len(logs) // 2
+    return _bisect(logs[:middle], save_batch, failures) + _bisect(logs[middle:], save_batch, failures)
+
+def _dead_letter_payload(log):
+    return json.dumps({key: value for key, value in log.items() if key != 'message_id'}, ensure_ascii=False, default=str).encode('utf-8')
+
+def save_isolating(batch, save_batch, tracker):
+    """Saves batch like save_batch; when it fails on its data, bisects it so one bad row can't block the queue.
+
+    Rows that save on their own are committed (a redelivery of them is deduplicated), rows that fail on their
+    own are requeued until they have failed tracker.max_attempts times and then go to log_dead_letters.
+    Raises, so the caller requeues the batch, while any failing row still has attempts left.
+    """
+    try:
+        return save_batch(batch)
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception as e:
+        error = e
+
+    print(f"Batch of {len(batch.logs)} logs failed to save ({error}), isolating the failing rows")
+    failures = []
+    saved = _bisect(batch.logs, save_batch, failures)
+    if not failures:
+        # Only failed as a whole (e.g. a conflict with a concurrent writer); the parts went through
+        rest = ParsedBatch()
+        rest.dead_letters, rest.counts = batch.dead_letters, batch.counts
+        return saved + save_batch(rest)
+
+    exhausted = [tracker.failed(log) for log, _ in failures]
+    if not all(exhausted):
+        raise error
+
+    print(f"Dead-lettering {len(failures)} logs that failed {tracker.max_attempts} times")
+    rest = ParsedBatch()
+    rest.dead_letters = batch.dead_letters + [
+        dead_letter(_dead_letter_payload(log), log.get('message_id'), f"Failed to save: {type(e).__name__}: {e}")
+        for log, e in failures
+    ]
+    # The rows stay counted under how they parsed; failed also counts them, as they didn't make it into logs
+    rest.counts = {**batch.counts, FAILED: batch.counts.get(FAILED, 0) + len(failures)}
+    saved += save_batch(rest)
+    for log, _ in failures:
+        tracker.forget(log)
+    return saved
@@ -1,9 +1,9 @@
 import pika
 import os
-import json
 import time
-import re
-from datetime import datetime
+from utils.log_parser import parse_batch
+from utils.log_envelope import unpack_message
+from utils.poison_batch import PoisonTracker, save_isolating
 
 def get_rabbitmq_connection():
     rabbitmq_host = os.getenv('RABBITMQ_HOST', 'localhost')
@@ -56,53 +56,59 @@ def setup_rabbitmq():
     connection.close()
     return True
 
-def consume_all_logs():
+_rabbitmq_ready = False
+
+def ensure_rabbitmq():
+    # Declares exchange/queue/binding once per process; later calls are free
+    global _rabbitmq_ready
+    if not _rabbitmq_ready:
+        setup_rabbitmq()
+        _rabbitmq_ready = True
+    return True
+
+# Shared by all drain requests of this process, so repeated drains count attempts on the same poison rows
+_drain_poison = PoisonTracker()
+
+def consume_all_logs(save_batch, batch_size=None):
+    batch_size = batch_size or int(os.getenv('DRAIN_BATCH_SIZE', 5000))
     connection = get_rabbitmq_connection()
     channel = connection.channel()
     
     channel.queue_declare(queue='logging_queue', durable=True)
     
-    logs = []
+    saved_count = 0
     
-    while True:
-        method_frame, header_frame, body = channel.basic_get(queue='logging_queue', auto_ack=True)
-        if method_frame is None:
-            break
-        
-        try:
-            log_message = body.decode('utf-8')
+    try:
+        while True:
+            messages = []
+            delivery_tag = None
             
-            # Parse string format: <timestamp> <LogType> <URL> Correlation: <CorrelationId> [<serviceName>] - <Message>
-            # Example: 2026-01-01 21:03:03,751 INFO http://localhost:5003/health Correlation: 3411af89 [payment-service] - Klic storitve GET /health
+            while len(messages) < batch_size:
+                method_frame, header_frame, body = channel.basic_get(queue='logging_queue', auto_ack=False)
+                if method_frame is None:
+                    break
+                
+                delivery_tag = method_frame.delivery_tag
+                messages.extend(unpack_message(body, header_frame))
             
-            pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) (\w+) (\S+) Correlation: (\S+) \[([^\]]+)\] - (.+)$'
-            match = re.match(pattern, log_message)
+            if delivery_tag is None:
+                break
             
-            if match:
-                timestamp_str, log_type, url, correlation_id, service_name, message = match.groups()
-                
-                # Convert timestamp to ISO format
-                timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S,%f').isoformat()
-                
-                log_data = {
-                    'timestamp': timestamp,
-                    'log_type': log_type,
-                    'url': url,
-                    'correlation_id': correlation_id,
-                    'service_name': service_name,
-                    'message': message
-                }
-                logs.append(log_data)
-            else:
-                # If format doesn't match, try JSON fallback (for backward compatibility)
-                try:
-                    log_data = json.loads(log_message)
-                    logs.append(log_data)
-                except:
-                    print(f"Unable to parse log message: {log_message}")
-                    
-        except Exception as e:
-            print(f"Error parsing log message: {e}")
+            received = len(messages)
+            
+            # Messages stay unacked until their batch is committed, so a failed save puts them back in the queue;
+            # rows that keep failing on their own are dead-lettered after CONSUMER_POISON_ATTEMPTS drains
+            try:
+                saved_count += save_isolating(parse_batch(messages), save_batch, _drain_poison)
+            except Exception:
+                channel.basic_nack(delivery_tag=delivery_tag, multiple=True, requeue=True)
+                raise
+            
+            channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+            
+            if received < batch_size:
+                break
+    finally:
+        connection.close()
     
-    connection.close()
-    return logs
\ No newline at end of file
+    return saved_count
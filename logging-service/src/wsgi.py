@@ -0,0 +1,4 @@
+from main import app
+
+# Served by gunicorn: gunicorn -c gunicorn.conf.py
+# Per-worker startup (RabbitMQ setup, partitions, consumer) runs from the post_worker_init hook
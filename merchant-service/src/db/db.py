@@ -1,12 +1,51 @@
 import os
+import time
 import psycopg2
+from psycopg2.extensions import connection as BaseConnection
 from psycopg2.extras import RealDictCursor
+from src.utils.request_context import record_db_time
+
+# Time spent connecting, running statements and committing counts as the current request's DB time
+class TimedCursor(RealDictCursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_db_time(started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_db_time(started)
+
+class TimedConnection(BaseConnection):
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            record_db_time(started)
+
+    def rollback(self):
+        started = time.perf_counter()
+        try:
+            return super().rollback()
+        finally:
+            record_db_time(started)
 
 def get_connection():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASS"),
-        cursor_factory=RealDictCursor
-    )
+    started = time.perf_counter()
+    try:
+        return psycopg2.connect(
+            host=os.getenv("DB_HOST"),
+            database=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASS"),
+            connection_factory=TimedConnection,
+            cursor_factory=TimedCursor
+        )
+    finally:
+        record_db_time(started)
@@ -1,10 +1,63 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from src.routes.merchant_routes import router as merchant_router
 from src.routes.merchant_location_routes import router as merchant_location_router
 from src.routes.merchant_hours_routes import router as merchant_hours_router
+from src.utils.rabbitmq_logger import rabbitmq_logger
+from src.utils.request_context import RequestContext, current_request
+import os
+import uuid
+
+# Requests slower than this are logged as WARN, so slow endpoints stand out in the logging-service filters
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
 
 app = FastAPI()
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    correlation_id = request.headers.get('X-Correlation-ID')
+    if not correlation_id:
+        correlation_id = str(uuid.uuid4())
+
+    request.state.correlation_id = correlation_id
+    context = RequestContext(correlation_id)
+    token = current_request.set(context)
+
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers['X-Correlation-ID'] = correlation_id
+        return response
+    finally:
+        current_request.reset(token)
+        duration_ms = context.elapsed * 1000
+        db_ms = context.db_time * 1000
+
+        # One record per request, published by the background thread; nothing here waits on the broker
+        log = rabbitmq_logger.log_info
+        if status >= 500:
+            log = rabbitmq_logger.log_error
+        elif duration_ms >= SLOW_REQUEST_MS:
+            log = rabbitmq_logger.log_warn
+        log(
+            url=f"http://{request.url.hostname}:{request.url.port}{request.url.path}",
+            correlation_id=correlation_id,
+            message=f"Klic storitve {request.method} {request.url.path} {status} {duration_ms:.1f} ms (DB {db_ms:.1f} ms, {context.db_calls}x)",
+            fields={
+                'method': request.method,
+                'path': request.url.path,
+                'status': status,
+                'duration_ms': round(duration_ms, 3),
+                'db_ms': round(db_ms, 3),
+                'db_calls': context.db_calls
+            }
+        )
+
+@app.on_event("shutdown")
+def flush_logs():
+    # Publishes whatever is still queued before the worker exits
+    rabbitmq_logger.close()
+
 app.include_router(merchant_router)
 app.include_router(merchant_location_router)
 app.include_router(merchant_hours_router)
@@ -0,0 +1,4 @@
+from log_client.rabbitmq_logger import RabbitMQLogger, FORMAT_BATCH
+
+# The logger itself is shared with notification-service (shared/log_client)
+rabbitmq_logger = RabbitMQLogger('merchant-service', default_format=FORMAT_BATCH)
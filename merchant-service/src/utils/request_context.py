@@ -0,0 +1,32 @@
+import time
+from contextvars import ContextVar
+
+class RequestContext:
+    """Per-request correlation id and DB time, shared by the middleware and the threadpool running the route."""
+
+    def __init__(self, correlation_id):
+        self.correlation_id = correlation_id
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_calls = 0
+
+    def add_db_time(self, elapsed):
+        self.db_time += elapsed
+        self.db_calls += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+# Set by the middleware in main.py; sync routes run in a copy of the request's context, so they see the same
+# RequestContext object and their DB time adds up on it
+current_request = ContextVar('current_request', default=None)
+
+def current_correlation_id():
+    context = current_request.get()
+    return context.correlation_id if context is not None else None
+
+def record_db_time(started):
+    context = current_request.get()
+    if context is not None:
+        context.add_db_time(time.perf_counter() - started)
@@ -1,11 +1,17 @@
 import os
 import requests
+from src.utils.request_context import current_correlation_id
 
 USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:5001")
 
+def _headers():
+    # Passes the request's correlation id on, so user-service logs line up with ours
+    correlation_id = current_correlation_id()
+    return {"X-Correlation-ID": correlation_id} if correlation_id else {}
+
 def get_user(user_id: int):
     url = f"{USER_SERVICE_URL}/users/{user_id}"
-    response = requests.get(url, timeout=3)
+    response = requests.get(url, headers=_headers(), timeout=3)
 
     if response.status_code != 200:
         return None
@@ -18,6 +24,7 @@ def upgrade_user_role(user_id: int):
     response = requests.put(
         url, 
         json={"role": "merchant"},
+        headers=_headers(),
         timeout=3
     )
 
@@ -26,6 +26,11 @@ async def correlation_id_middleware(request: Request, call_next):
     
     return response
 
+@app.on_event("shutdown")
+def flush_logs():
+    # Publishes whatever is still queued before the worker exits
+    rabbitmq_logger.close()
+
 app.include_router(notification_router)
 app.include_router(preferences_router)
 
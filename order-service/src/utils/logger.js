@@ -47,7 +47,7 @@ function sendLog(logType, url, correlationId, message) {
                 EXCHANGE_NAME,
                 '',
                 Buffer.from(JSON.stringify(logData)),
-                { persistent: true }
+                { persistent: true, messageId: uuidv4() }
             );
             console.log('✅ Log sent successfully');
         } catch (error) {
@@ -53,7 +53,7 @@ class RabbitMQLogger {
                 'logs_exchange',
                 '',
                 Buffer.from(logMessage),
-                { persistent: true }
+                { persistent: true, messageId: uuidv4() }
             );
 
             return true;
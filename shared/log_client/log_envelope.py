@@ -0,0 +1,56 @@
+import gzip
+import json
+import uuid
+import pika
+
+# Batched log envelope, unpacked by logging-service (logging-service/src/utils/log_envelope.py):
+#   content_type      application/vnd.logs.batch+json
+#   content_encoding  gzip or unset
+#   headers           {'x-log-envelope-version': 1}
+#   body              {"version": 1, "service_name": "...", "records": [{"id", "timestamp", "log_type", "url",
+#                      "correlation_id", "message"}, ...]}
+ENVELOPE_CONTENT_TYPE = 'application/vnd.logs.batch+json'
+ENVELOPE_VERSION_HEADER = 'x-log-envelope-version'
+ENVELOPE_VERSION = 1
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_NONE = 'none'
+
+def encode_record(timestamp, log_type, url, correlation_id, message, message_id, fields=None):
+    record = {
+        'id': message_id,
+        'timestamp': timestamp.isoformat(timespec='milliseconds'),
+        'log_type': log_type,
+        'url': url,
+        'correlation_id': correlation_id,
+        'message': message
+    }
+    if fields:
+        # Extra keys ride along in the record; consumers that don't know them ignore them
+        record.update((key, value) for key, value in fields.items() if key not in record)
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+def is_record(body):
+    # Encoded records are JSON objects, formatted lines always start with the timestamp
+    return body[:1] in ('{', b'{')
+
+def build_envelope(records, service_name, compression=COMPRESSION_GZIP):
+    """Returns (body, properties) for one message carrying the already encoded records."""
+    # Records are spliced in as they are, without decoding and re-encoding each one
+    parts = [record.decode('utf-8') if isinstance(record, (bytes, bytearray)) else record for record in records]
+    body = (
+        f'{{"version":{ENVELOPE_VERSION},"service_name":{json.dumps(service_name)},"records":[' + ','.join(parts) + ']}'
+    ).encode('utf-8')
+
+    content_encoding = None
+    if compression == COMPRESSION_GZIP:
+        body = gzip.compress(body)
+        content_encoding = 'gzip'
+
+    return body, pika.BasicProperties(
+        delivery_mode=2,
+        message_id=str(uuid.uuid4()),
+        content_type=ENVELOPE_CONTENT_TYPE,
+        content_encoding=content_encoding,
+        headers={ENVELOPE_VERSION_HEADER: ENVELOPE_VERSION}
+    )
@@ -0,0 +1,213 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# Record: <payload length><crc32 of payload>, payload = message_id + b'\n' + body.
+# A zero length (fresh, zero-filled file) or a crc mismatch (torn write) marks the end of a segment.
+RECORD_HEADER = struct.Struct('<II')
+EMPTY_HEADER = bytes(RECORD_HEADER.size)
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.spool'
+
+class _Segment:
+    def __init__(self, directory, seq, size=None):
+        self.seq = seq
+        self.path = os.path.join(directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if size is not None:
+                # Sparse, zero-filled: the first empty header is the end of data
+                os.ftruncate(fd, size)
+            self.size = os.fstat(fd).st_size
+            self.map = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self.end = self._scan()
+
+    def _scan(self):
+        offset = 0
+        while offset + RECORD_HEADER.size <= self.size:
+            length, crc = RECORD_HEADER.unpack_from(self.map, offset)
+            start = offset + RECORD_HEADER.size
+            if length == 0 or start + length > self.size or zlib.crc32(self.map[start:start + length]) != crc:
+                break
+            offset = start + length
+        return offset
+
+    def records(self, offset, limit):
+        """Up to `limit` (body, message_id) records from offset, and the offset after the last one."""
+        records = []
+        while offset < self.end and len(records) < limit:
+            length, _ = RECORD_HEADER.unpack_from(self.map, offset)
+            start = offset + RECORD_HEADER.size
+            message_id, _, body = self.map[start:start + length].partition(b'\n')
+            records.append((body, message_id.decode('ascii')))
+            offset = start + length
+        return records, offset
+
+    def count(self, offset):
+        count = 0
+        while offset < self.end:
+            length, _ = RECORD_HEADER.unpack_from(self.map, offset)
+            offset += RECORD_HEADER.size + length
+            count += 1
+        return count
+
+    def append(self, payload):
+        header_end = self.end + RECORD_HEADER.size
+        RECORD_HEADER.pack_into(self.map, self.end, len(payload), zlib.crc32(payload))
+        self.map[header_end:header_end + len(payload)] = payload
+        self.end = header_end + len(payload)
+        if self.end + RECORD_HEADER.size <= self.size:
+            # Clears whatever a torn earlier write may have left after the new end
+            self.map[self.end:self.end + RECORD_HEADER.size] = EMPTY_HEADER
+
+    def close(self, remove=False):
+        self.map.close()
+        if remove:
+            os.remove(self.path)
+
+class LogSpool:
+    """Append-only, segment-rotated ring of memory-mapped files holding log records the broker couldn't take.
+
+    One writer and one reader (replayer); the read position is persisted in `cursor` after each confirmed batch.
+    When `max_segments` are full the oldest segment is discarded, unread records in it are counted in `dropped`.
+    Each process takes the first free `slot-N` directory (flock), so several workers can share one spool dir and
+    a restarted worker picks up what a previous one left behind.
+    """
+
+    def __init__(self, directory, segment_size=4 * 1024 * 1024, max_segments=16, sync=True):
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.sync = sync
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+        self.directory, self._lock_file = self._acquire_slot(directory)
+        self.segments = [
+            _Segment(self.directory, seq)
+            for seq in sorted(
+                int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                for name in os.listdir(self.directory)
+                if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+            )
+        ]
+        if not self.segments:
+            self.segments.append(_Segment(self.directory, 0, segment_size))
+        self.cursor = self._load_cursor()
+
+    @staticmethod
+    def _acquire_slot(directory):
+        os.makedirs(directory, exist_ok=True)
+        slot = 0
+        while True:
+            path = os.path.join(directory, f"slot-{slot}")
+            os.makedirs(path, exist_ok=True)
+            lock_file = open(os.path.join(path, 'lock'), 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return path, lock_file
+            except BlockingIOError:
+                lock_file.close()
+                slot += 1
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, 'cursor')) as cursor_file:
+                seq, offset = (int(value) for value in cursor_file.read().split())
+        except (OSError, ValueError):
+            seq, offset = self.segments[0].seq, 0
+        return self._clamp_cursor(seq, offset)
+
+    def _clamp_cursor(self, seq, offset):
+        oldest = self.segments[0]
+        if seq < oldest.seq:
+            return oldest.seq, 0
+        return seq, offset
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, 'cursor')
+        with open(path + '.tmp', 'w') as cursor_file:
+            cursor_file.write(f"{self.cursor[0]} {self.cursor[1]}")
+            if self.sync:
+                cursor_file.flush()
+                os.fsync(cursor_file.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _segment(self, seq):
+        for segment in self.segments:
+            if segment.seq == seq:
+                return segment
+        return None
+
+    def _rotate(self):
+        active = self.segments[-1]
+        if self.sync:
+            active.map.flush()
+        self.segments.append(_Segment(self.directory, active.seq + 1, self.segment_size))
+
+        while len(self.segments) > self.max_segments:
+            oldest = self.segments.pop(0)
+            seq, offset = self.cursor
+            if seq <= oldest.seq:
+                self.dropped += oldest.count(offset if seq == oldest.seq else 0)
+                self.cursor = (self.segments[0].seq, 0)
+            oldest.close(remove=True)
+            print(f"Log spool full, discarded segment {oldest.seq}")
+
+    def append(self, records):
+        """Appends (body, message_id) records; returns how many were stored."""
+        stored = 0
+        with self._lock:
+            for body, message_id in records:
+                payload = message_id.encode('ascii') + b'\n' + (body.encode('utf-8') if isinstance(body, str) else body)
+                needed = RECORD_HEADER.size + len(payload)
+                if needed > self.segment_size:
+                    self.dropped += 1
+                    continue
+                if self.segments[-1].end + needed > self.segments[-1].size:
+                    self._rotate()
+                self.segments[-1].append(payload)
+                stored += 1
+            if self.sync and stored:
+                self.segments[-1].map.flush()
+        return stored
+
+    def pending(self):
+        with self._lock:
+            active = self.segments[-1]
+            return self.cursor != (active.seq, active.end)
+
+    def read(self, limit):
+        """Up to `limit` unread records and the position to commit once they are confirmed."""
+        with self._lock:
+            seq, offset = self.cursor
+            while True:
+                segment = self._segment(seq)
+                if segment is None:
+                    return [], self.cursor
+                records, end = segment.records(offset, limit)
+                if records or segment is self.segments[-1]:
+                    return records, (seq, end)
+                # Finished a rotated-out segment, continue with the next one
+                seq, offset = seq + 1, 0
+
+    def commit(self, position):
+        with self._lock:
+            self.cursor = self._clamp_cursor(*position)
+            # Fully replayed segments other than the one being written are deleted
+            while self.segments[0].seq < self.cursor[0]:
+                self.segments.pop(0).close(remove=True)
+            self._save_cursor()
+
+    def close(self):
+        with self._lock:
+            for segment in self.segments:
+                if self.sync:
+                    segment.map.flush()
+                segment.close()
+            self.segments = []
+            self._lock_file.close()
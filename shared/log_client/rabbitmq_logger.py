@@ -0,0 +1,366 @@
+import pika
+import atexit
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from log_client.circuit_breaker import CircuitBreaker
+from log_client.log_spool import LogSpool
+from log_client.log_envelope import COMPRESSION_GZIP, build_envelope, encode_record, is_record
+
+# How records go on the wire: one formatted line per message, or batched envelopes (log_envelope.py)
+FORMAT_LINE = 'line'
+FORMAT_BATCH = 'batch'
+
+# What send_log does when the in-memory queue is full
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_NEW = 'drop_new'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK, OVERFLOW_DROP_NEW)
+
+class RabbitMQLogger:
+    """Formats log lines on the caller's thread and hands them to a background publisher thread.
+
+    send_log never touches the network: records go into a bounded in-memory queue that a single
+    publisher thread drains in batches, so request latency doesn't include broker round trips.
+    While the broker is unreachable (circuit breaker open) batches go to a local spool on disk instead,
+    and a replayer thread publishes them with publisher confirms once the broker is back.
+
+    pika connections aren't thread-safe, so each connection belongs to exactly one thread: self.connection
+    and self.channel only to the publisher, the replay connection only to the replayer. Caller threads
+    share nothing with them but the queue (guarded by _condition), the spool and the breaker (own locks).
+    """
+
+    def __init__(self, service_name, default_format=FORMAT_LINE):
+        self.rabbitmq_host = os.getenv('RABBITMQ_HOST', 'localhost')
+        self.rabbitmq_port = int(os.getenv('RABBITMQ_PORT', 5672))
+        self.rabbitmq_user = os.getenv('RABBITMQ_USER', 'admin')
+        self.rabbitmq_pass = os.getenv('RABBITMQ_PASS', 'admin')
+        self.service_name = service_name
+        self.connection = None
+        self.channel = None
+
+        self.queue_size = int(os.getenv('RABBITMQ_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = int(os.getenv('RABBITMQ_LOG_BATCH_SIZE', 200))
+        # block only suits sync callers (threadpool routes); it never waits longer than block_timeout
+        self.overflow = os.getenv('RABBITMQ_LOG_OVERFLOW', OVERFLOW_DROP_OLDEST)
+        self.block_timeout = float(os.getenv('RABBITMQ_LOG_BLOCK_TIMEOUT', 1.0))
+        self.retry_delay = float(os.getenv('RABBITMQ_LOG_RETRY_DELAY', 5))
+        self.close_timeout = float(os.getenv('RABBITMQ_LOG_CLOSE_TIMEOUT', 5))
+        self.connect_timeout = float(os.getenv('RABBITMQ_LOG_CONNECT_TIMEOUT', 2))
+        self.spool_dir = os.getenv('RABBITMQ_LOG_SPOOL_DIR', os.path.join(tempfile.gettempdir(), f'{service_name}-log-spool'))
+        self.spool_segment_size = int(os.getenv('RABBITMQ_LOG_SPOOL_SEGMENT_SIZE', 4 * 1024 * 1024))
+        self.spool_segments = int(os.getenv('RABBITMQ_LOG_SPOOL_SEGMENTS', 16))
+        self.replay_batch_size = int(os.getenv('RABBITMQ_LOG_REPLAY_BATCH_SIZE', 500))
+        # batch: up to batch_size records per message, so the broker sees one message per publisher batch
+        self.format = os.getenv('RABBITMQ_LOG_FORMAT', default_format)
+        self.compression = os.getenv('RABBITMQ_LOG_COMPRESSION', COMPRESSION_GZIP)
+        if self.format not in (FORMAT_LINE, FORMAT_BATCH):
+            print(f"Unknown RABBITMQ_LOG_FORMAT '{self.format}', using {FORMAT_LINE}")
+            self.format = FORMAT_LINE
+        if self.overflow not in OVERFLOW_POLICIES:
+            print(f"Unknown RABBITMQ_LOG_OVERFLOW '{self.overflow}', using {OVERFLOW_DROP_OLDEST}")
+            self.overflow = OVERFLOW_DROP_OLDEST
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._replayer = None
+        self._pid = None
+        self._close_lock = threading.Lock()
+        self._spooled = threading.Event()
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('RABBITMQ_LOG_BREAKER_FAILURES', 3)),
+            reset_timeout=float(os.getenv('RABBITMQ_LOG_BREAKER_RESET', 5)),
+            max_reset_timeout=float(os.getenv('RABBITMQ_LOG_BREAKER_MAX_RESET', 60))
+        )
+        self.spool = None
+
+        self.published = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.messages_sent = 0
+
+        atexit.register(self.close)
+
+    def _open_channel(self):
+        credentials = pika.PlainCredentials(self.rabbitmq_user, self.rabbitmq_pass)
+        parameters = pika.ConnectionParameters(
+            host=self.rabbitmq_host,
+            port=self.rabbitmq_port,
+            credentials=credentials,
+            heartbeat=600,
+            blocked_connection_timeout=300,
+            socket_timeout=self.connect_timeout
+        )
+        connection = pika.BlockingConnection(parameters)
+        channel = connection.channel()
+
+        channel.exchange_declare(
+            exchange='logs_exchange',
+            exchange_type='fanout',
+            durable=True
+        )
+        return connection, channel
+
+    def connect(self):
+        try:
+            self.connection, self.channel = self._open_channel()
+            return True
+        except Exception as e:
+            print(f"Failed to connect to RabbitMQ: {e}")
+            return False
+
+    @staticmethod
+    def _close_connection(connection):
+        try:
+            if connection and not connection.is_closed:
+                connection.close()
+        except Exception as e:
+            print(f"Error closing RabbitMQ connection: {e}")
+
+    def _disconnect(self):
+        self._close_connection(self.connection)
+        self.connection = None
+        self.channel = None
+
+    def _open_spool(self):
+        try:
+            self.spool = LogSpool(self.spool_dir, self.spool_segment_size, self.spool_segments)
+        except OSError as e:
+            # Without a spool, failed batches are held in memory and retried instead
+            print(f"Log spool unavailable ({self.spool_dir}): {e}")
+            self.spool = None
+
+    def _ensure_publisher(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._condition:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's connection, spool slot and threads don't exist here
+                self.connection = None
+                self.channel = None
+                self.spool = None
+                self._queue.clear()
+            self._pid = os.getpid()
+            self._stopping.clear()
+            if self.spool is None:
+                self._open_spool()
+            self._thread = threading.Thread(target=self._run, name='rabbitmq-log-publisher', daemon=True)
+            self._thread.start()
+            if self.spool is not None:
+                self._replayer = threading.Thread(target=self._replay, name='rabbitmq-log-replayer', daemon=True)
+                self._replayer.start()
+
+    def _enqueue(self, record):
+        self._ensure_publisher()
+        with self._condition:
+            if len(self._queue) >= self.queue_size:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == OVERFLOW_BLOCK:
+                    if not self._condition.wait_for(lambda: len(self._queue) < self.queue_size, self.block_timeout):
+                        self.dropped += 1
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+            self._queue.append(record)
+            self._condition.notify_all()
+        return True
+
+    def _take_batch(self):
+        with self._condition:
+            # Idle wake-ups let the connection answer heartbeats
+            self._condition.wait_for(lambda: self._queue or self._stopping.is_set(), timeout=30)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            # Producers waiting under the block policy can continue
+            self._condition.notify_all()
+        return batch
+
+    def _publish_batch(self, batch):
+        # Publishes from the front of batch, removing what was sent; returns False if the broker failed
+        if not self.breaker.allow():
+            return False
+        try:
+            if not self.channel or self.connection.is_closed:
+                if not self.connect():
+                    self.breaker.record_failure()
+                    return False
+
+            pending = len(batch)
+            try:
+                self._publish_records(self.channel, batch)
+            finally:
+                self.published += pending - len(batch)
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            print(f"Failed to send logs to RabbitMQ: {e}")
+            self.breaker.record_failure()
+            self._disconnect()
+            return False
+
+    def _publish_records(self, channel, records):
+        # Publishes from the front of records, removing what was sent so a failure leaves only the unsent part.
+        # Encoded records (batch format, also when replayed from the spool) go out as envelopes, lines one by one.
+        messages = 0
+        try:
+            while records:
+                count = 0
+                while count < min(len(records), self.batch_size) and is_record(records[count][0]):
+                    count += 1
+                if count:
+                    body, properties = build_envelope([body for body, _ in records[:count]], self.service_name, self.compression)
+                else:
+                    body, message_id = records[0]
+                    properties = pika.BasicProperties(delivery_mode=2, message_id=message_id)
+                    count = 1
+                channel.basic_publish(
+                    exchange='logs_exchange',
+                    routing_key='',
+                    body=body,
+                    properties=properties
+                )
+                del records[:count]
+                messages += 1
+        finally:
+            # Publisher and replayer both get here
+            with self._condition:
+                self.messages_sent += messages
+
+    def _spool_batch(self, batch):
+        stored = self.spool.append(batch)
+        with self._condition:
+            self.dropped += len(batch) - stored
+        batch.clear()
+        self._spooled.set()
+
+    def _run(self):
+        batch = []
+        while True:
+            if not batch:
+                batch = self._take_batch()
+                if not batch:
+                    if self._stopping.is_set():
+                        break
+                    if self.connection and self.connection.is_open:
+                        try:
+                            self.connection.process_data_events(time_limit=0)
+                        except Exception as e:
+                            print(f"RabbitMQ connection lost: {e}")
+                            self._disconnect()
+                    continue
+
+            if self._publish_batch(batch):
+                continue
+            if self.spool is not None:
+                # Broker down: the batch goes to disk right away, so the queue keeps draining
+                self._spool_batch(batch)
+            # Without a spool the unsent part of a failed batch is retried first; records published before
+            # the failure aren't resent, and a resend after an unconfirmed publish is deduplicated by message_id
+            elif self._stopping.wait(self.retry_delay):
+                break
+
+        self._disconnect()
+
+    def _replay(self):
+        # Own connection and channel, with publisher confirms: a spooled record is only released
+        # once the broker has confirmed it
+        connection = channel = None
+        while not self._stopping.is_set():
+            if not self.spool.pending():
+                self._spooled.wait(timeout=1)
+                self._spooled.clear()
+                continue
+            if not self.breaker.allow():
+                self._stopping.wait(0.5)
+                continue
+
+            try:
+                if channel is None or connection.is_closed:
+                    connection, channel = self._open_channel()
+                    channel.confirm_delivery()
+
+                records, position = self.spool.read(self.replay_batch_size)
+                replayed = len(records)
+                self._publish_records(channel, records)
+                self.spool.commit(position)
+                self.replayed += replayed
+                self.breaker.record_success()
+            except Exception as e:
+                # The batch stays in the spool and is replayed from its start; confirmed records that get
+                # published again are deduplicated by message_id in logging-service
+                print(f"Failed to replay spooled logs: {e}")
+                self.breaker.record_failure()
+                self._close_connection(connection)
+                connection = channel = None
+
+        self._close_connection(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'queued': len(self._queue),
+                'published': self.published,
+                'replayed': self.replayed,
+                'messages_sent': self.messages_sent,
+                'dropped': self.dropped + (self.spool.dropped if self.spool is not None else 0),
+                'spool_pending': self.spool.pending() if self.spool is not None else False,
+                'breaker_open': self.breaker.is_open
+            }
+
+    def close(self):
+        """Stops the publisher after it has flushed the queue, or after RABBITMQ_LOG_CLOSE_TIMEOUT."""
+        # FastAPI shutdown and atexit can both get here
+        with self._close_lock:
+            self._close()
+
+    def _close(self):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._spooled.set()
+        with self._condition:
+            self._condition.notify_all()
+        threads = [thread for thread in (self._thread, self._replayer) if thread is not None]
+        for thread in threads:
+            thread.join(self.close_timeout)
+        self._thread = None
+        self._replayer = None
+        # A thread still stuck on the broker after the timeout keeps the spool open, the next start reuses it
+        if self.spool is not None and not any(thread.is_alive() for thread in threads):
+            self.spool.close()
+            self.spool = None
+
+    def send_log(self, log_type, url, correlation_id, message, fields=None):
+        # fields: extra structured values (timings, status) that only the batch format carries
+        now = datetime.now()
+        message_id = str(uuid.uuid4())
+        if self.format == FORMAT_BATCH:
+            return self._enqueue((encode_record(now, log_type.upper(), url, correlation_id, message, message_id, fields), message_id))
+
+        # Format timestamp: 2020-12-15 16:26:04,797
+        timestamp = now.strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+
+        # Format: <timestamp> <LogType> <URL> Correlation: <CorrelationId> [<serviceName>] - <Sporočilo>
+        log_message = f"{timestamp} {log_type.upper()} {url} Correlation: {correlation_id} [{self.service_name}] - {message}"
+
+        return self._enqueue((log_message, message_id))
+
+    def log_info(self, url, correlation_id, message, fields=None):
+        self.send_log('INFO', url, correlation_id, message, fields)
+
+    def log_error(self, url, correlation_id, message, fields=None):
+        self.send_log('ERROR', url, correlation_id, message, fields)
+
+    def log_warn(self, url, correlation_id, message, fields=None):
+        self.send_log('WARN', url, correlation_id, message, fields)
@@ -0,0 +1,207 @@
+"""
+Obremenitveni test za log_client/rabbitmq_logger.py: veliko niti hkrati kliče log_info/log_warn/log_error,
+na koncu pa preverimo, da se nobeno sporočilo ni izgubilo, podvojilo (razen ponovitev z istim message_id
+po izpadu) ali prepletlo z drugim.
+
+Namesto RabbitMQ se uporabi nadomestna pika BlockingConnection, ki si zapomni objavljena sporočila in
+javi vsako uporabo povezave iz niti, ki je ni odprla. Z --fail-every posrednik vsako N-to objavo vrne
+napako, tako da gre del sporočil prek diskovnega spoola in niti za ponovno pošiljanje. Z --format batch
+logger pošilja paketne ovojnice (log_client/log_envelope.py); nadomestni posrednik jih razpakira in zapise
+preveri enako kot vrstice.
+
+Uporaba:
+    python shared/scripts/stress_rabbitmq_logger.py --threads 64 --messages 2000
+    python shared/scripts/stress_rabbitmq_logger.py --threads 32 --messages 1000 --fail-every 5000
+    python shared/scripts/stress_rabbitmq_logger.py --threads 64 --messages 2000 --format batch
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+LINE_PATTERN = re.compile(
+    r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} (INFO|WARN|ERROR) /stress/(\d+) '
+    r'Correlation: stress-(\d+)-(\d+) \[notification-service\] - sporočilo (\d+) niti (\d+) (x*)$'
+)
+
+class StandInBroker:
+    def __init__(self, fail_every):
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.published = []
+        self.messages = 0
+        self.attempts = 0
+        self.connections = 0
+        self.foreign_calls = []
+
+    def connection(self, parameters):
+        with self.lock:
+            self.connections += 1
+        return StandInConnection(self)
+
+class StandInChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.confirms = False
+
+    def exchange_declare(self, exchange, exchange_type, durable):
+        self.connection.check_thread('exchange_declare')
+
+    def confirm_delivery(self):
+        self.connection.check_thread('confirm_delivery')
+        self.confirms = True
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.connection.check_thread('basic_publish')
+        broker = self.connection.broker
+        with broker.lock:
+            broker.attempts += 1
+            if broker.fail_every and broker.attempts % broker.fail_every == 0:
+                self.connection.is_closed = True
+                raise ConnectionError('stand-in broker failure')
+            broker.messages += 1
+            broker.published.extend(unpack(body, properties))
+
+def unpack(body, properties):
+    # Envelope records are turned back into the line format, so both formats are checked the same way
+    from log_client.log_envelope import ENVELOPE_CONTENT_TYPE
+    if properties.content_type != ENVELOPE_CONTENT_TYPE:
+        return [(body if isinstance(body, str) else body.decode('utf-8'), properties.message_id)]
+    if properties.content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    envelope = json.loads(body)
+    return [
+        (
+            f"{datetime.fromisoformat(record['timestamp']).strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]} {record['log_type']} "
+            f"{record['url']} Correlation: {record['correlation_id']} [{envelope['service_name']}] - {record['message']}",
+            record['id']
+        )
+        for record in envelope['records']
+    ]
+
+class StandInConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.owner = threading.get_ident()
+        self.is_closed = False
+        self._channel = StandInChannel(self)
+
+    @property
+    def is_open(self):
+        return not self.is_closed
+
+    def check_thread(self, operation):
+        if threading.get_ident() != self.owner:
+            with self.broker.lock:
+                self.broker.foreign_calls.append((operation, threading.current_thread().name))
+
+    def channel(self):
+        self.check_thread('channel')
+        return self._channel
+
+    def process_data_events(self, time_limit=0):
+        self.check_thread('process_data_events')
+
+    def close(self):
+        self.check_thread('close')
+        self.is_closed = True
+
+def produce(logger, thread_index, messages, padding, start):
+    start.wait()
+    for seq in range(messages):
+        log = (logger.log_info, logger.log_warn, logger.log_error)[seq % 3]
+        log(f"/stress/{thread_index}", f"stress-{thread_index}-{seq}", f"sporočilo {seq} niti {thread_index} {'x' * padding}")
+
+def check(broker, threads, messages, padding):
+    problems = []
+    received = Counter()
+    ids = {}
+    for body, message_id in broker.published:
+        match = LINE_PATTERN.match(body)
+        if not match:
+            problems.append(f"corrupted or interleaved line: {body[:120]!r}")
+            continue
+        _, url_thread, corr_thread, corr_seq, seq, thread_index, filler = match.groups()
+        if not (url_thread == corr_thread == thread_index and corr_seq == seq and len(filler) == padding):
+            problems.append(f"fields from different records in one line: {body[:120]!r}")
+            continue
+        key = (int(thread_index), int(seq))
+        if key in ids and ids[key] != message_id:
+            problems.append(f"record {key} published twice with different message_id")
+        ids[key] = message_id
+        received[key] += 1
+
+    expected = {(thread_index, seq) for thread_index in range(threads) for seq in range(messages)}
+    lost = expected - received.keys()
+    if lost:
+        problems.append(f"{len(lost)} records lost, e.g. {sorted(lost)[:5]}")
+    for operation, thread_name in broker.foreign_calls[:5]:
+        problems.append(f"connection used from a thread that didn't open it: {operation} on {thread_name}")
+    return problems, sum(count - 1 for count in received.values())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--messages', type=int, default=2000, help='messages per thread')
+    parser.add_argument('--padding', type=int, default=200, help='filler characters per message')
+    parser.add_argument('--fail-every', type=int, default=0, help='fail every Nth publish (0 = never)')
+    parser.add_argument('--format', choices=('line', 'batch'), default='line')
+    args = parser.parse_args()
+
+    os.environ['RABBITMQ_LOG_FORMAT'] = args.format
+    # Blocking overflow so a slow publisher can't legitimately drop records during the test
+    os.environ.setdefault('RABBITMQ_LOG_OVERFLOW', 'block')
+    os.environ.setdefault('RABBITMQ_LOG_BLOCK_TIMEOUT', '60')
+    os.environ.setdefault('RABBITMQ_LOG_BREAKER_RESET', '0.05')
+    os.environ.setdefault('RABBITMQ_LOG_CLOSE_TIMEOUT', '60')
+    os.environ['RABBITMQ_LOG_SPOOL_DIR'] = tempfile.mkdtemp(prefix='log-spool-')
+
+    import pika
+    from log_client.rabbitmq_logger import RabbitMQLogger
+
+    broker = StandInBroker(args.fail_every)
+    pika.BlockingConnection = broker.connection
+    logger = RabbitMQLogger('notification-service')
+
+    total = args.threads * args.messages
+    start = threading.Event()
+    producers = [
+        threading.Thread(target=produce, args=(logger, index, args.messages, args.padding, start), name=f"producer-{index}")
+        for index in range(args.threads)
+    ]
+    for producer in producers:
+        producer.start()
+
+    started = time.perf_counter()
+    start.set()
+    for producer in producers:
+        producer.join()
+    produced = time.perf_counter() - started
+
+    # With failures injected, part of the load sits in the spool until the replayer has sent it
+    while logger.stats()['queued'] or logger.stats()['spool_pending']:
+        time.sleep(0.05)
+    logger.close()
+    elapsed = time.perf_counter() - started
+
+    stats = logger.stats()
+    problems, duplicates = check(broker, args.threads, args.messages, args.padding)
+    print(f"{args.threads} threads x {args.messages} messages = {total}")
+    print(f"send_log calls: {produced:.3f} s ({total / produced:.0f}/s), delivered after {elapsed:.3f} s")
+    print(f"published={stats['published']} replayed={stats['replayed']} dropped={stats['dropped']} "
+          f"resent duplicates={duplicates} connections={broker.connections} publish attempts={broker.attempts}")
+    print(f"broker messages: {broker.messages} ({total / max(broker.messages, 1):.1f} records per message)")
+    if stats['dropped']:
+        problems.append(f"logger dropped {stats['dropped']} records")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)